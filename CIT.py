@@ -1,16 +1,27 @@
 import requests
-import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 import logging
+import time
 from datetime import datetime, timedelta
-import seaborn as sns
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from colorama import Fore, Style, init
 import argparse
-import matplotlib.dates as mdates
-from data_fetcher import get_economic_data,calculate_monotonic_relationships,visualize_relationships
-from sklearn.preprocessing import MinMaxScaler
-from matplotlib.ticker import FuncFormatter
+from data_fetcher import get_economic_data,fetch_economic_data,calculate_monotonic_relationships,visualize_relationships
+import instrumentation
+from price_store import PriceStore
+from price_series import PriceSeries, as_price_series
+from memoization import get_result_cache
+from candle_downloader import CANDLE_COLUMNS, CandleDownloader
+from intraday import entry_timing, resample_ohlc
+from exporters import export
+from alignment import AlignedIndicators, align_indicators
+from analysis import investment_analysis, periodic_investment_analysis, aligned_panel, instrument_comparison, indicator_comparison
+from streaming_analytics import IncrementalAnalytics
+from strategy_sweep import sweep_periodic_investment, lump_sum_returns
+from config import PRICE_STORE_PATH, PRICE_REFRESH_INTERVAL, INDICATOR_RESULT_TTL, SERVICE_HOST, SERVICE_PORT
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -18,289 +29,478 @@ pd.options.mode.chained_assignment = None
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Commodity names accepted in place of fxempire instrument symbols: name -> (instrument, price column).
+COMMODITIES = {
+    'gold': ("XAU/USD", "Gold_USD_Price"),
+    'silver': ("XAG/USD", "Silver_USD_Price"),
+    'platinum': ("XPT/USD", "Platinum_USD_Price"),
+    'palladium': ("XPD/USD", "Palladium_USD_Price"),
+}
+
+
+def resolve_instrument(commodity_type: str) -> Tuple[str, str, str]:
+    """
+    Maps a commodity name or an fxempire instrument symbol (e.g. 'XPT/USD', 'EUR/USD') to
+    (instrument, price column name, display label).
+    """
+    name = commodity_type.strip()
+    if name.lower() in COMMODITIES:
+        instrument, price_column_name = COMMODITIES[name.lower()]
+        return instrument, price_column_name, name.lower().capitalize()
+    if '/' in name:
+        return name.upper(), name.upper(), name.upper()
+    raise ValueError(f"Invalid commodity type. Please use one of {', '.join(COMMODITIES)} or an instrument symbol such as 'XPT/USD'.")
+
+
+def _commodity_argument(value: str) -> str:
+    """
+    argparse type of --commodity: accepts whatever `resolve_instrument` accepts.
+    """
+    try:
+        resolve_instrument(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+    return value
+
+
 class CommodityInvestmentTracker:
-    def __init__(self):
+    def __init__(self, store_path: Optional[str] = PRICE_STORE_PATH, refresh_interval: float = PRICE_REFRESH_INTERVAL,
+                 max_workers: int = 4, memoize: bool = True):
         self.gold_df = None
         self.silver_df = None
-
-    def get_commodity_data(self, start_date: str, commodity_type: str) -> pd.DataFrame:
+        self.store = PriceStore(store_path) if store_path else None
+        self.refresh_interval = refresh_interval
+        self.downloader = CandleDownloader(max_workers=max_workers)
+        self.analytics: Dict[str, IncrementalAnalytics] = {}
+        # (engine, latest series fed into it); only that series and its slices are known to match the engine.
+        self._analytics_sources: Dict[str, Tuple[IncrementalAnalytics, PriceSeries]] = {}
+        self.max_workers = max_workers
+        # (instruments...) -> (built at, first requested epoch second, aligned price panel)
+        self._panels: Dict[tuple, Tuple[float, int, pd.DataFrame]] = {}
+        # Shared results of repeated analyses; they must not be modified by callers.
+        self.result_cache = get_result_cache() if memoize else None
+
+    def get_commodity_data(self, start_date: str, commodity_type: str, refresh: bool = False) -> pd.DataFrame:
+        return self.get_price_series(start_date, commodity_type, refresh).to_frame()
+
+    @instrumentation.timed('tracker.get_price_series')
+    def get_price_series(self, start_date: str, commodity_type: str, refresh: bool = False) -> PriceSeries:
         start_date_unix = int(datetime.strptime(start_date, '%d-%m-%Y').timestamp())
 
-        if commodity_type.lower() == 'gold':
-            instrument = "XAU/USD"
-            price_column_name = "Gold_USD_Price"
-        elif commodity_type.lower() == 'silver':
-            instrument = "XAG/USD"
-            price_column_name = "Silver_USD_Price"
+        instrument, price_column_name, _ = resolve_instrument(commodity_type)
+
+        granularity = "D"
+
+        if self.store is None:
+            candles = self._fetch_candles(instrument, granularity, start_date_unix)
         else:
-            raise ValueError("Invalid commodity type. Please use 'gold' or 'silver'.")
-
-        url = "https://www.fxempire.com/api/v1/en/commodities/chart/candles"
-        querystring = {
-            "instrument": instrument,
-            "granularity": "D",
-            "from": str(start_date_unix),
-            "price": "M",
-            "count": "5000"
-        }
-
-        headers = {
-            "accept": "*/*",
-            "accept-language": "en-US,en;q=0.9,tr-TR;q=0.8,tr;q=0.7",
-            "api_version": "$GITHUB_SHA",
-            "priority": "u=1, i",
-            "referer": "https://www.fxempire.com/commodities/silver",
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": "Windows",
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "token": "null",
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
-        }
+            fetched_from = self._sync_store(instrument, granularity, start_date_unix, refresh=refresh)
+            if fetched_from is not None and self.result_cache is not None:
+                self.result_cache.invalidate(price_column_name, fetched_from // 86400)
+            candles = self.store.load(instrument, granularity, start=start_date_unix)
+
+        series = PriceSeries.from_dates(pd.to_datetime(candles["Date"]), candles["Close"], price_column_name)
+        self._update_analytics(series)
+
+        return series
+
+    @instrumentation.timed('analytics.update')
+    def _update_analytics(self, series: PriceSeries):
+        """
+        Feeds newly seen candles into the instrument's incremental analytics engine.
+
+        The engine is only rebuilt when the data now starts before it; otherwise just the candles
+        from its last date onwards are appended (the last one may have been revised), under the
+        engine's lock so analyses reading it on other threads see it before or after the update.
+        """
+        if len(series) == 0:
+            return
+        engine = self.analytics.get(series.name)
+        if engine is not None:
+            with engine.lock:
+                if len(engine) and series.first_date >= engine.first_date:
+                    position = series.bounds(start=engine.last_date)[0]
+                    engine.extend(series.dates[position:], series.close[position:])
+                    self._analytics_sources[series.name] = (engine, series)
+                    return
+        # A rebuilt engine is only published once it holds the whole series.
+        engine = IncrementalAnalytics()
+        engine.extend(series.dates, series.close)
+        self.analytics[series.name] = engine
+        self._analytics_sources[series.name] = (engine, series)
+
+    def _analytics_for(self, series: PriceSeries) -> Optional[IncrementalAnalytics]:
+        """
+        Returns the analytics engine holding the prices of `series`, if it provably holds them.
+
+        That is only the case for the series last fed into it by `get_price_series` and its
+        slices, i.e. arrays sharing its buffers; any other data (scaled, resampled, loaded
+        elsewhere) is recomputed by the analyses.
+        """
+        paired = self._analytics_sources.get(series.name)
+        if paired is None or len(series) == 0 or series.close.dtype != np.float64:
+            return None
+        engine, source = paired
+        if _buffer(series.days) is _buffer(source.days) and _buffer(series.close) is _buffer(source.close):
+            return engine
+        return None
+
+    @contextmanager
+    def _locked_analytics(self, series: PriceSeries) -> Iterator[Optional[IncrementalAnalytics]]:
+        """
+        Yields `_analytics_for(series)` with the engine locked, so it is not updated while an analysis reads it.
+        """
+        engine = self._analytics_for(series)
+        if engine is None:
+            yield None
+            return
+        with engine.lock:
+            yield engine if self._analytics_for(series) is engine else None
+
+    def _sync_store(self, instrument: str, granularity: str, start_date_unix: int, end_unix: Optional[int] = None,
+                    refresh: bool = False) -> Optional[int]:
+        """
+        Brings the local store up to date for a query from `start_date_unix` to `end_unix` (inclusive, default now).
+
+        Only the parts that are missing on disk are requested: the candles before the stored
+        coverage, and the candles from the last stored one onwards (it is re-fetched because it
+        may have been partial) unless the series was refreshed within `refresh_interval` or the
+        query ends before it. A first fetch and the delta stop at `end_unix`.
+
+        Returns:
+        - int: The earliest epoch second candles were (re)written from, None if nothing was fetched.
+        """
+        coverage = self.store.coverage(instrument, granularity)
+        stop = None if end_unix is None else end_unix + 1
+        ranges = []
+
+        if coverage is None:
+            ranges.append((start_date_unix, stop))
+        else:
+            # Backfilled up to the stored coverage even past `end_unix`, so the coverage stays gap-free.
+            if start_date_unix < coverage[0]:
+                ranges.append((start_date_unix, coverage[0]))
+            last_stored = self.store.last_timestamp(instrument, granularity)
+            last_stored = coverage[0] if last_stored is None else last_stored
+            if ((refresh or time.time() - coverage[1] >= self.refresh_interval)
+                    and (end_unix is None or end_unix >= last_stored)):
+                ranges.append((last_stored, stop))
+
+        if not ranges:
+            logging.info(f"Serving {instrument} ({granularity}) from the local price store.")
+            instrumentation.count('price_store.hits')
+            return None
+
+        instrumentation.count('price_store.misses')
+
+        # Pages are written as they arrive, so intraday histories never have to fit in memory.
+        # The coverage is only widened once every page is stored.
+        written = 0
+        try:
+            for lo, hi in ranges:
+                for candles in self.downloader.iter_pages(instrument, granularity, lo, hi):
+                    written += self.store.upsert(instrument, granularity, candles, None)
+        except requests.RequestException as e:
+            logging.error(f"Error fetching data from API: {e}")
+            raise
 
+        fetch_from = ranges[0][0]
+        # Only a fetch reaching the present counts as a refresh.
+        reached_now = ranges[-1][1] is None or ranges[-1][1] >= time.time()
+        self.store.mark_covered(instrument, granularity, fetch_from, refreshed=reached_now)
+        logging.info(f"Stored {written} {instrument} ({granularity}) candles fetched in {len(ranges)} range(s) "
+                     f"from {fetch_from}.")
+        return fetch_from
+
+    def iter_candles(self, start_date: str, commodity_type: str, granularity: str = "H1", end_date: str = None,
+                     refresh: bool = False, chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Yields the OHLC candles of an instrument at any granularity in date-ordered chunks.
+
+        Args:
+        - start_date (str): First date, dd-mm-yyyy.
+        - commodity_type (str): A commodity name or instrument symbol, see `resolve_instrument`.
+        - granularity (str): A key of `candle_downloader.GRANULARITY_SECONDS`, e.g. 'M1', 'H1' or 'D'.
+        - end_date (str): Last date (inclusive), dd-mm-yyyy; defaults to now.
+        - refresh (bool): Fetch new candles even if the store was refreshed recently.
+        - chunk_rows (int): Candles per chunk read from the store.
+
+        With a store the missing candles are first streamed into it page by page and then read
+        back in chunks; without one the API pages are yielded as they arrive.
+        """
+        instrument, _, _ = resolve_instrument(commodity_type)
+        start_unix = int(datetime.strptime(start_date, '%d-%m-%Y').timestamp())
+        end_unix = None
+        if end_date is not None:
+            end_unix = int((datetime.strptime(end_date, '%d-%m-%Y') + timedelta(days=1)).timestamp()) - 1
+
+        if self.store is None:
+            for candles in self.downloader.iter_pages(instrument, granularity, start_unix,
+                                                      None if end_unix is None else end_unix + 1):
+                if end_unix is not None:
+                    candles = candles[candles["Date"] <= pd.Timestamp(end_unix, unit='s')]
+                if len(candles):
+                    yield candles
+            return
+
+        self._sync_store(instrument, granularity, start_unix, end_unix, refresh)
+        yield from self.store.iter_load(instrument, granularity, start=start_unix, end=end_unix, chunk_rows=chunk_rows)
+
+    def get_candles(self, start_date: str, commodity_type: str, granularity: str = "H1", resample_to: str = None,
+                    end_date: str = None, refresh: bool = False) -> pd.DataFrame:
+        """
+        Returns the OHLC candles of an instrument, optionally aggregated on the fly to a coarser
+        granularity (e.g. M1 candles to 'H1' or 'D' bars) so only the bars are held in memory.
+        """
+        chunks = self.iter_candles(start_date, commodity_type, granularity, end_date, refresh)
+        if resample_to is not None:
+            chunks = resample_ohlc(chunks, resample_to)
+        frames = [chunk for chunk in chunks if len(chunk)]
+        if not frames:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def intraday_entry_timing(self, start_date: str, commodity_type: str, granularity: str = "H1",
+                              slot_minutes: int = 60, end_date: str = None) -> pd.DataFrame:
+        """
+        Shows how buying at each time of day (UTC) compared with buying at that day's close,
+        computed chunk by chunk over the stored intraday history; see `intraday.EntryTimingProfile`.
+        """
+        return entry_timing(self.iter_candles(start_date, commodity_type, granularity, end_date), slot_minutes)
+
+    def _fetch_candles(self, instrument: str, granularity: str, from_unix: int) -> pd.DataFrame:
         try:
-            response = requests.get(url, headers=headers, params=querystring)
-            response.raise_for_status()
-            data = response.json()
+            return self.downloader.download(instrument, granularity, from_unix)
         except requests.RequestException as e:
             logging.error(f"Error fetching data from API: {e}")
             raise
 
-        df = pd.DataFrame(data)
-        df["Date"] = pd.to_datetime(df["Date"]).dt.strftime('%d-%m-%Y')
-        df = df[["Date", "Close"]]
-        df = df.rename(columns={'Close': price_column_name})
-        df[price_column_name] = pd.to_numeric(df[price_column_name], errors='coerce')
-        df.set_index('Date', inplace=True)
 
-        return df
+    def analyze_investment(self, df: Union[pd.DataFrame, PriceSeries], start_date: str, initial_investment: float = 100,
+                           end_date: str = None, plot: bool = True) -> Dict[str, Any]:
+        series = as_price_series(df)
+        with self._locked_analytics(series) as analytics:
+            compute = lambda: investment_analysis(series, start_date, initial_investment, end_date, analytics=analytics)
+            if self.result_cache is None:
+                result = compute()
+            else:
+                # Without an end date the annualized return runs to today, so the day is part of the key.
+                # The cache is shared by all trackers, so results read from an engine are kept apart.
+                params = (start_date, end_date or str(pd.Timestamp.today().date()), initial_investment,
+                          analytics is not None)
+                result = self.result_cache.get_or_compute('investment', series, start_date, end_date, params, compute)
 
+        if plot:
+            from rendering import plot_investment_analysis
+            plot_investment_analysis(result)
 
-    def analyze_investment(self, df: pd.DataFrame, start_date: str, initial_investment: float = 100, end_date: str = None) -> Dict[str, Any]:
-        start_date = pd.to_datetime(start_date, format='%d-%m-%Y')
-        
-        if end_date is None:
-            end_date = pd.to_datetime('today')
-        else:
-            end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
-        
-        df.index = pd.to_datetime(df.index, format='%d-%m-%Y')
-        
-        df_filtered = df[(df.index >= start_date) & (df.index <= end_date)]
-        
-        if df_filtered.empty:
-            raise ValueError("No data available in the specified date range.")
-        
-        start_price = df_filtered.iloc[0, 0]
-        units_bought = initial_investment / start_price
-        
-        df_filtered['Investment_Value'] = df_filtered.iloc[:, 0] * units_bought
-        
-        min_value_after_start = df_filtered['Investment_Value'].min()
-        max_value = df_filtered['Investment_Value'].max()
-        final_value = df_filtered['Investment_Value'].iloc[-1]
-        total_return = final_value - initial_investment
-        years = (end_date - start_date).days / 365.25
-        annualized_return = (final_value / initial_investment) ** (1 / years) - 1 if years > 0 else 0
-
-        plt.figure(figsize=(15, 10))
-
-        metrics_text = (f"Initial Investment: ${initial_investment:.2f}\n"
-                        f"Final Value: ${final_value:.2f}\n"
-                        f"Total Return: ${total_return:.2f}\n"
-                        f"Annualized Return: {annualized_return:.2%}")
-        plt.suptitle(f"Investment Analysis from {start_date.strftime('%d-%m-%Y')} to {end_date.strftime('%d-%m-%Y')}\n{metrics_text}", fontsize=12, fontweight='bold')
-
-        plt.subplot(2, 2, 1)
-        plt.plot(df_filtered.index, df_filtered.iloc[:, 0], label='Price')
-        plt.title('Price Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Price (USD)')
-        plt.legend()
-
-        plt.subplot(2, 2, 2)
-        plt.plot(df_filtered.index, df_filtered['Investment_Value'], label='Investment Value', color='green')
-        plt.title('Investment Value Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Value (USD)')
-        plt.legend()
-
-        plt.subplot(2, 2, 3)
-        rolling_window = 30
-        df_filtered['Rolling_Mean'] = df_filtered.iloc[:, 0].rolling(window=rolling_window).mean()
-        df_filtered['Rolling_STD'] = df_filtered.iloc[:, 0].rolling(window=rolling_window).std()
-        plt.plot(df_filtered.index, df_filtered['Rolling_Mean'], label='Rolling Mean', color='orange')
-        plt.plot(df_filtered.index, df_filtered['Rolling_STD'], label='Rolling Standard Deviation', color='purple')
-        plt.title(f'Rolling Mean and Std Dev ({rolling_window}-Days)')
-        plt.xlabel('Date')
-        plt.ylabel('Value')
-        plt.legend()
-
-        plt.subplot(2, 2, 4)
-        df_filtered['Daily_Returns'] = df_filtered.iloc[:, 0].pct_change() * 100
-        df_filtered['Month'] = df_filtered.index.month
-        df_filtered['Year'] = df_filtered.index.year
-        heatmap_data = df_filtered.pivot_table(values='Daily_Returns', index='Year', columns='Month', aggfunc='mean')
-        sns.heatmap(heatmap_data, cmap='coolwarm', annot=True, fmt=".2f")
-        plt.title('Heatmap of Monthly Mean Daily Returns')
-        plt.xlabel('Month')
-        plt.ylabel('Year')
-        plt.xticks(ticks=range(12), labels=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-
-        plt.tight_layout(rect=[0, 0, 1, 0.96])
-        plt.show()
-
-        return "Analysis Completed"    
-
-    def analyze_and_plot_periodic_investment(self, df: pd.DataFrame, start_date: str, end_date: str, 
+        return result
+
+    def analyze_and_plot_periodic_investment(self, df: Union[pd.DataFrame, PriceSeries], start_date: str, end_date: str, 
                                              interval_days: int, investment_amount: float, 
-                                             commodity_type: str) -> Dict[str, Any]:
-        start_date = pd.to_datetime(start_date, format='%d-%m-%Y')
-        end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
-        df.index = pd.to_datetime(df.index, format='%d-%m-%Y')
-        
-        df = df[(df.index >= start_date) & (df.index <= end_date)]
-        
-        if df.empty:
-            raise ValueError("Belirtilen tarih aralığı için veri bulunamadı.")
-
-        investment_dates = pd.date_range(start=start_date, end=end_date, freq=f'{interval_days}D')
-        total_invested = 0
-        units_bought = 0
-        investment_growth = []
-
-        for date in investment_dates:
-            if date in df.index:
-                price = df.loc[date].iloc[0]
-                units_bought += investment_amount / price
-                total_invested += investment_amount
-                current_value = units_bought * price
-                investment_growth.append({'Date': date, 'Value': current_value, 'Total_Invested': total_invested})
-
-        growth_df = pd.DataFrame(investment_growth)
-        growth_df.set_index('Date', inplace=True)
-
-        final_value = units_bought * df.iloc[-1].iloc[0]
-        total_return = final_value - total_invested
-        years = (end_date - start_date).days / 365.25
-        annualized_return = (final_value / total_invested) ** (1 / years) - 1 if years > 0 else 0
-
-        plt.figure(figsize=(15, 10))
-        
-        metrics_text = (f"Periodical Investment Analysis:\n"
-                        f"Total invested: ${total_invested:.2f}\n"
-                        f"Final Value: ${final_value:.2f}\n"
-                        f"Total Return: ${total_return:.2f}\n"
-                        f"Annualized Return: {annualized_return:.2%}")
-
-        plt.suptitle(f"{commodity_type.capitalize()} Investment Analysis\n{metrics_text}", fontsize=12, fontweight='bold')
-
-        plt.subplot(2, 2, 1)
-        plt.plot(df.index, df.iloc[:, 0], label='Price')
-        plt.title(f'{commodity_type.capitalize()} Price in Time')
-        plt.xlabel('Date')
-        plt.ylabel('Price (USD)')
-        plt.legend()
-
-        plt.subplot(2, 2, 2)
-        plt.plot(growth_df.index, growth_df['Value'], label='Investment Value', color='green')
-        plt.plot(growth_df.index, growth_df['Total_Invested'], label='Total Invested', color='red', linestyle='--')
-        plt.title('Periodical Investment Growth In time')
-        plt.xlabel('Date')
-        plt.ylabel('Value (USD)')
-        plt.legend()
-
-        plt.subplot(2, 2, 3)
-        rolling_window = 30
-        df['Rolling_Mean'] = df.iloc[:, 0].rolling(window=rolling_window).mean()
-        df['Rolling_STD'] = df.iloc[:, 0].rolling(window=rolling_window).std()
-        plt.plot(df.index, df['Rolling_Mean'], label='Rolling Mean', color='orange')
-        plt.plot(df.index, df['Rolling_STD'], label='Rolling Standard Deviation', color='purple')
-        plt.title(f'Rolling Mean and Rolling Std. ({rolling_window}-Days)')
-        plt.xlabel('Date')
-        plt.ylabel('Value')
-        plt.legend()
-
-        plt.subplot(2, 2, 4)
-        df['Daily_Returns'] = df.iloc[:, 0].pct_change() * 100
-        df['Month'] = df.index.month
-        df['Year'] = df.index.year
-        heatmap_data = df.pivot_table(values='Daily_Returns', index='Year', columns='Month', aggfunc='mean')
-        sns.heatmap(heatmap_data, cmap='coolwarm', annot=True, fmt=".2f")
-        plt.title('Heatmap of Monthly mean of the daily returns')
-        plt.xlabel('Month')
-        plt.ylabel('Year')
-        plt.xticks(ticks=range(12), labels=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-        
-        plt.tight_layout(rect=[0, 0, 1, 0.96])
-        plt.show()
-
-        return "Analysis Completed"
-        
-   
-
-    def save_to_excel(self, df: pd.DataFrame, file_path: str):
+                                             commodity_type: str, alignment: str = 'next',
+                                             plot: bool = True) -> Dict[str, Any]:
+        series = as_price_series(df)
+        with self._locked_analytics(series) as analytics:
+            compute = lambda: periodic_investment_analysis(series, start_date, end_date, interval_days,
+                                                           investment_amount, alignment, analytics=analytics)
+            if self.result_cache is None:
+                result = compute()
+            else:
+                params = (start_date, end_date, interval_days, investment_amount, alignment, analytics is not None)
+                result = self.result_cache.get_or_compute('periodic', series, start_date, end_date, params, compute)
+
+        if plot:
+            from rendering import plot_periodic_investment
+            plot_periodic_investment(result, commodity_type)
+
+        return result
+
+    def sweep_periodic_investment(self, df: Union[pd.DataFrame, PriceSeries], start_dates, intervals, amounts=(100,),
+                                  end_date: str = None, alignment: str = 'next', processes: int = None) -> pd.DataFrame:
+        series = as_price_series(df)
+        start_dates = pd.to_datetime(pd.Index(start_dates), format='%d-%m-%Y')
+        if end_date is not None:
+            end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
+
+        return sweep_periodic_investment(series.dates, series.close, start_dates, intervals, amounts,
+                                         end_date=end_date, alignment=alignment, processes=processes)
+
+    def lump_sum_returns(self, df: Union[pd.DataFrame, PriceSeries], initial_investment: float = 100, end_date: str = None,
+                         processes: int = None) -> pd.DataFrame:
+        series = as_price_series(df)
+        if end_date is not None:
+            end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
+
+        return lump_sum_returns(series.dates, series.close, initial_investment,
+                                end_date=end_date, processes=processes)
+
+    def save_to_excel(self, df: Union[pd.DataFrame, PriceSeries], file_path: str):
+        self.export(df, file_path, fmt='xlsx')
+
+    def export(self, data, file_path: str, fmt: Optional[str] = None, append: bool = False) -> Optional[int]:
+        """
+        Saves prices, an analysis table or an iterable of chunks as CSV, JSON Lines, Parquet, Arrow or Excel.
+
+        Args:
+        - data (PriceSeries, pd.DataFrame or iterable of them): What to save.
+        - file_path (str): Output file; the format follows the extension unless `fmt` is given.
+        - fmt (str): One of 'csv', 'jsonl', 'parquet', 'arrow', 'xlsx'.
+        - append (bool): Add to an existing export instead of replacing it.
+
+        Returns:
+        - int: The number of rows written, or None if saving failed.
+        """
         try:
-            df.to_excel(file_path, index=True)
+            rows = export(data, file_path, fmt=fmt, append=append)
             print(f"{Fore.GREEN}Data successfully saved to {file_path}{Style.RESET_ALL}")
+            return rows
         except Exception as e:
-            print(f"{Fore.RED}Error saving data to Excel: {e}{Style.RESET_ALL}")
+            logging.error(f"Error exporting to {file_path}: {e}")
+            print(f"{Fore.RED}Error saving data to {file_path}: {e}{Style.RESET_ALL}")
+
+    def fetch_price_series(self, start_dates: Dict[str, str], refresh: bool = False
+                           ) -> Tuple[Dict[str, PriceSeries], Dict[str, Exception]]:
+        """
+        Fetches several instruments concurrently, each from its own start date.
+
+        Args:
+        - start_dates (dict): Commodity name or instrument symbol -> start date in dd-mm-yyyy format.
+        - refresh (bool): Fetch new candles even if the store was refreshed recently.
+
+        Returns:
+        - tuple: A dict of name -> PriceSeries for the instruments that could be fetched and a
+          dict of name -> the exception raised for those that failed.
+        """
+        def fetch(name):
+            try:
+                return name, self.get_price_series(start_dates[name], name, refresh), None
+            except Exception as e:
+                return name, None, e
+
+        results, failures = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(start_dates)))) as executor:
+            for name, series, error in executor.map(fetch, list(start_dates)):
+                if error is None:
+                    results[name] = series
+                else:
+                    failures[name] = error
+        return results, failures
+
+    def instrument_panel(self, instruments: List[str], start_date: str, refresh: bool = False) -> pd.DataFrame:
+        """
+        Returns the prices of several instruments from `start_date` on, aligned on their common dates.
+
+        The instruments are fetched concurrently and joined once. The panel is kept for
+        `refresh_interval` seconds, so later calls for the same instruments starting on or after
+        `start_date` are served from memory without fetching or aligning again.
+        """
+        resolved = [resolve_instrument(name) for name in instruments]
+        key = tuple(instrument for instrument, _, _ in resolved)
+        start_date_unix = int(datetime.strptime(start_date, '%d-%m-%Y').timestamp())
 
-    def compare_commodities(self, start_date: str, end_date: str):
+        cached = self._panels.get(key)
+        if (not refresh and cached is not None and start_date_unix >= cached[1]
+                and time.time() - cached[0] < self.refresh_interval):
+            instrumentation.count('panel_cache.hits')
+            return cached[2]
+        instrumentation.count('panel_cache.misses')
+
+        fetched, failures = self.fetch_price_series({name: start_date for name in instruments}, refresh)
+        if failures:
+            raise failures[next(iter(failures))]
+        series = [fetched[name] for name in instruments]
+
+        panel = aligned_panel({label: prices for (_, _, label), prices in zip(resolved, series)})
+        self._panels[key] = (time.time(), start_date_unix, panel)
+        return panel
+
+    def compare_instruments(self, instruments: List[str], start_date: str, end_date: str = None,
+                            plot: bool = True) -> Dict[str, Any]:
+        """
+        Compares any number of instruments between two dates.
+
+        Args:
+        - instruments (list): Commodity names ('gold', 'silver', ...) or fxempire symbols ('XPT/USD', 'EUR/USD', ...).
+        - start_date (str): Start date in dd-mm-yyyy format.
+        - end_date (str): End date in dd-mm-yyyy format, the latest available date if None.
+        - plot (bool): Whether to display the normalized prices.
+
+        Returns:
+        - dict: See `analysis.instrument_comparison`.
+        """
+        panel = self.instrument_panel(instruments, start_date)
+        result = instrument_comparison(panel, start_date, end_date)
+
+        if plot:
+            from rendering import plot_commodity_comparison
+            plot_commodity_comparison(result)
+
+        return result
+
+    def compare_commodities(self, start_date: str, end_date: str, plot: bool = True) -> Optional[Dict[str, Any]]:
         try:
-            self.gold_df = self.get_commodity_data(start_date, commodity_type='gold')
-            self.silver_df = self.get_commodity_data(start_date, commodity_type='silver')
-            
-            self.gold_df.index = pd.to_datetime(self.gold_df.index, format='%d-%m-%Y')
-            self.silver_df.index = pd.to_datetime(self.silver_df.index, format='%d-%m-%Y')
-            
-            common_dates = self.gold_df.index.intersection(self.silver_df.index)
-            self.gold_df = self.gold_df.loc[common_dates]
-            self.silver_df = self.silver_df.loc[common_dates]
-            
-            start = pd.to_datetime(start_date, format='%d-%m-%Y')
-            end = pd.to_datetime(end_date, format='%d-%m-%Y')
-            mask = (self.gold_df.index >= start) & (self.gold_df.index <= end)
-            self.gold_df = self.gold_df.loc[mask]
-            self.silver_df = self.silver_df.loc[mask]
-            
-            gold_normalized = self.gold_df['Gold_USD_Price'] / self.gold_df['Gold_USD_Price'].iloc[0] * 100
-            silver_normalized = self.silver_df['Silver_USD_Price'] / self.silver_df['Silver_USD_Price'].iloc[0] * 100
-            
-            gold_return = (self.gold_df['Gold_USD_Price'].iloc[-1] - self.gold_df['Gold_USD_Price'].iloc[0]) / self.gold_df['Gold_USD_Price'].iloc[0] * 100
-            silver_return = (self.silver_df['Silver_USD_Price'].iloc[-1] - self.silver_df['Silver_USD_Price'].iloc[0]) / self.silver_df['Silver_USD_Price'].iloc[0] * 100
-            
-            plt.figure(figsize=(12, 6))
-            plt.plot(self.gold_df.index, gold_normalized, label='Gold')
-            plt.plot(self.silver_df.index, silver_normalized, label='Silver')
-            plt.title('Gold vs Silver Price Comparison (Normalized)')
-            plt.xlabel('Date')
-            plt.ylabel('Normalized Price (Base = 100)')
-            plt.legend()
-            
-            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            plt.gca().xaxis.set_major_locator(mdates.AutoDateLocator())
-            plt.gcf().autofmt_xdate()  
-            
-            plt.tight_layout()
-            plt.show()
-            
+            result = self.compare_instruments(['gold', 'silver'], start_date, end_date, plot=plot)
+            result['gold'] = result['panel'][['Gold']].rename(columns={'Gold': 'Gold_USD_Price'})
+            result['silver'] = result['panel'][['Silver']].rename(columns={'Silver': 'Silver_USD_Price'})
+            result['metrics']['gold_return'] = result['metrics']['total_return']['Gold']
+            result['metrics']['silver_return'] = result['metrics']['total_return']['Silver']
+            self.gold_df = result['gold']
+            self.silver_df = result['silver']
+
             print(f"{Fore.YELLOW}Performance Comparison:{Style.RESET_ALL}")
-            print(f"Gold return: {gold_return:.2f}%")
-            print(f"Silver return: {silver_return:.2f}%")
+            print(f"Gold return: {result['metrics']['gold_return']:.2f}%")
+            print(f"Silver return: {result['metrics']['silver_return']:.2f}%")
+            return result
         except Exception as e:
             logging.error(f"Error in compare_commodities: {e}")
             print(f"{Fore.RED}Error comparing commodities: {e}{Style.RESET_ALL}")
+
 def main():
     parser = argparse.ArgumentParser(description="Commodity Investment Analyzer")
-    parser.add_argument("--commodity", choices=['gold', 'silver'], help="Commodity type (gold or silver)")
+    parser.add_argument("--commodity", type=_commodity_argument,
+                        help=f"Commodity ({', '.join(COMMODITIES)}) or fxempire instrument symbol such as 'XPT/USD'")
     parser.add_argument("--start_date", help="Start date in dd-mm-yyyy format")
     parser.add_argument("--end_date", help="End date in dd-mm-yyyy format")
     parser.add_argument("--interval", type=int, help="Investment interval in days")
     parser.add_argument("--amount", type=float, help="Investment amount for each period")
+    parser.add_argument("--profile", nargs='?', const='', metavar="OUTPUT",
+                        help="Print a per-stage timing breakdown on exit; OUTPUT ending in .json saves it, "
+                             "any other OUTPUT (e.g. run.prof) saves a cProfile dump")
+    parser.add_argument("--jobs", metavar="JOB_FILE",
+                        help="Run every analysis in a JSON/YAML job file unattended and write one results file")
+    parser.add_argument("--output", help="Results file for --jobs (.jsonl, .csv, .parquet, ...), or the directory the "
+                             "results of a non-interactive periodic analysis are saved to as CSV")
+    parser.add_argument("--processes", type=int,
+                        help="Worker processes for --jobs and --serve (default: CPU count)")
+    parser.add_argument("--serve", nargs='?', const=SERVICE_PORT, type=int, metavar="PORT",
+                        help=f"Run the local HTTP/JSON analytics service (default port {SERVICE_PORT})")
+    parser.add_argument("--host", default=SERVICE_HOST, help="Address the --serve service listens on")
     args = parser.parse_args()
 
+    if args.profile is None:
+        run(args)
+    else:
+        with instrumentation.profile_session(args.profile or None):
+            run(args)
+
+
+def run(args):
+    if args.jobs:
+        from batch_runner import run_batch
+
+        results = run_batch(args.jobs, args.output, args.processes)
+        failed = int((results['status'] != 'ok').sum()) if len(results) else 0
+        print(f"{Fore.GREEN}Ran {len(results)} jobs, {failed} failed.{Style.RESET_ALL}")
+        return
+
+    if args.serve is not None:
+        from service import run_service
+
+        print(f"{Fore.CYAN}Serving analytics on http://{args.host}:{args.serve} (Ctrl+C to stop){Style.RESET_ALL}")
+        run_service(args.host, args.serve, processes=args.processes)
+        return
+
     print(f"{Fore.CYAN}******Commodity Investment Analysis******{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Welcome to the Commodity Investment Analyzer{Style.RESET_ALL}\n")
 
@@ -310,7 +510,8 @@ def main():
         commodity_type = args.commodity
         start_date = args.start_date
     else:
-        commodity_type = input(f"{Fore.YELLOW}Please enter the commodity type (gold/silver): {Style.RESET_ALL}").lower()
+        commodity_type = input(f"{Fore.YELLOW}Please enter the commodity type ({'/'.join(COMMODITIES)} "
+                               f"or a symbol such as XPT/USD): {Style.RESET_ALL}").lower()
         start_date = input(f"{Fore.YELLOW}Enter the starting date (dd-mm-yyyy): {Style.RESET_ALL}")
     
     try:
@@ -321,78 +522,154 @@ def main():
         print(f"{Fore.RED}Error getting commodity data: {e}{Style.RESET_ALL}")
         return
 
+    if args.end_date and args.interval and args.amount:
+        result = analyzer.analyze_and_plot_periodic_investment(df, start_date, args.end_date, args.interval,
+                                                               args.amount, commodity_type, plot=False)
+        metrics = result['metrics']
+        print(f"{Fore.GREEN}Total invested: ${metrics['total_invested']:.2f}\n"
+              f"Units bought: {metrics['units_bought']:.4f}\n"
+              f"Final Value: ${metrics['final_value']:.2f}\n"
+              f"Total Return: ${metrics['total_return']:.2f}\n"
+              f"Annualized Return: {metrics['annualized_return']:.2%}{Style.RESET_ALL}")
+        if args.output:
+            from exporters import export_result
+
+            export_result(result, args.output, fmt='csv')
+            print(f"{Fore.GREEN}Results saved to {args.output}{Style.RESET_ALL}")
+        return
+
     while True:
         print(f"\n{Fore.CYAN}What would you like to do?{Style.RESET_ALL}")
         print("1. Analyze periodic investments")
+        print("2. Analyze a single investment")
+        print("3. Compare gold and silver")
+        print("4. Save data (.csv, .jsonl, .parquet, .arrow or .xlsx)")
+        print("5. Exit")
+        choice = input(f"{Fore.YELLOW}Enter your choice: {Style.RESET_ALL}").strip()
 
-def compare_to_economic_indicators(commodity_data, economic_series_id):
-    """
-    Compares commodity data to a selected economic indicator.
-    Args:
-    - commodity_data (pd.DataFrame): A DataFrame containing commodity prices with dates as index.
-    - economic_series_id (str): The FRED series ID to compare against.
+        try:
+            if choice == '1':
+                end_date = args.end_date or input(f"{Fore.YELLOW}Enter the end date (dd-mm-yyyy): {Style.RESET_ALL}")
+                interval = args.interval or int(input(f"{Fore.YELLOW}Enter the investment interval in days: {Style.RESET_ALL}"))
+                amount = args.amount or float(input(f"{Fore.YELLOW}Enter the amount per investment: {Style.RESET_ALL}"))
+                analyzer.analyze_and_plot_periodic_investment(df, start_date, end_date, interval, amount, commodity_type)
+            elif choice == '2':
+                analyzer.analyze_investment(df, start_date, end_date=args.end_date)
+            elif choice == '3':
+                end_date = args.end_date or input(f"{Fore.YELLOW}Enter the end date (dd-mm-yyyy): {Style.RESET_ALL}")
+                analyzer.compare_commodities(start_date, end_date)
+            elif choice == '4':
+                analyzer.export(df, input(f"{Fore.YELLOW}Enter the file path: {Style.RESET_ALL}"))
+            elif choice == '5':
+                break
+            else:
+                print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
+        except Exception as e:
+            logging.error(f"Error running the analysis: {e}")
+            print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
 
-    Returns:
-    - None: Displays the comparison plot.
+def _buffer(values: np.ndarray) -> np.ndarray:
     """
-    start_date = commodity_data.index.min().strftime('%Y-%m-%d')
-    end_date = commodity_data.index.max().strftime('%Y-%m-%d')
+    Returns the array owning the memory of `values` (itself, or the base of a view).
+    """
+    return values if values.base is None else values.base
 
-    economic_data = get_economic_data(economic_series_id, start_date=start_date, end_date=end_date)
 
-    if economic_data.empty:
-        print(f"No data fetched for the series ID: {economic_series_id}. Please check the ID or try a different one.")
-        return
+def _fetch_window(commodity_data: PriceSeries, lag_days: int) -> Tuple[str, str]:
+    """
+    Returns the FRED date range covering `commodity_data`, starting `lag_days` earlier so the value
+    already published on its first date is included.
+    """
+    start_date = (commodity_data.first_date - timedelta(days=lag_days)).strftime('%Y-%m-%d')
+    return start_date, commodity_data.last_date.strftime('%Y-%m-%d')
 
-    date_col = next((col for col in ['date', 'DATE', 'Date'] if col in economic_data.columns), None)
-    if date_col is None:
-        raise KeyError(f"No 'date' column found in economic data for {economic_series_id}. Available columns: {economic_data.columns}")
 
-    economic_data[date_col] = pd.to_datetime(economic_data[date_col])
+def _indicator_comparison(commodity_data: PriceSeries, economic_series_id: str, publication_lag: int = 0,
+                          frequency: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Fetches an economic indicator over the span of `commodity_data` and aligns the two, or returns None if that fails.
+    """
+    start_date, end_date = _fetch_window(commodity_data, publication_lag)
 
-    commodity_data.index = pd.to_datetime(commodity_data.index)
+    economic_data = get_economic_data(economic_series_id, start_date=start_date, end_date=end_date)
 
-    economic_data.set_index(date_col, inplace=True)
+    if economic_data is None or economic_data.empty:
+        print(f"No data fetched for the series ID: {economic_series_id}. Please check the ID or try a different one.")
+        return None
 
     if 'value' not in economic_data.columns:
         print(f"No 'value' column found in the economic data for series {economic_series_id}. Available columns: {economic_data.columns}")
-        return
-
-    economic_data = economic_data.reindex(commodity_data.index, method='ffill').dropna()
+        return None
 
-    merged_data = pd.concat([commodity_data, economic_data['value']], axis=1, join='inner')
+    merged_data = indicator_comparison(commodity_data, economic_data, publication_lag, frequency)
 
     if merged_data.empty:
         print(f"No overlapping data between the commodity data and {economic_series_id} indicator. Please check the date range or data sources.")
-        return
+        return None
+
+    return merged_data
+
+
+def align_economic_indicators(commodity_data, economic_series_ids: List[str], publication_lags=None,
+                              frequency: Optional[str] = None) -> AlignedIndicators:
+    """
+    Fetches several economic indicators and puts them all onto the commodity's trading calendar at once.
+
+    Args:
+    - commodity_data (pd.DataFrame or PriceSeries): Commodity prices with dates as index.
+    - economic_series_ids (list): The FRED series IDs, of any frequency.
+    - publication_lags (int or dict): Days between an observation's date and its release, for all
+      series or per series ID (e.g. `config.PUBLICATION_LAGS`).
+    - frequency (str): Downsample the commodity to the last trading day of every 'W', 'M', 'Q' or 'Y'.
+
+    Returns:
+    - AlignedIndicators: Reusable aligned panel; `comparison(series_id)` gives the frame of
+      `compare_to_economic_indicators` for one series without realigning.
+    """
+    commodity_data = as_price_series(commodity_data)
+    lag_days = max(publication_lags.values(), default=0) if isinstance(publication_lags, dict) else publication_lags or 0
+    start_date, end_date = _fetch_window(commodity_data, lag_days)
+    frames, failures = fetch_economic_data(economic_series_ids, start_date=start_date, end_date=end_date)
+    for series_id, error in failures.items():
+        logging.error(f"Error fetching {series_id}: {error}")
+    return align_indicators(commodity_data, frames, publication_lags, frequency)
 
-    base_commodity_value = merged_data.iloc[0, 0]  # First commodity price
-    base_economic_value = merged_data['value'].iloc[0]  # First economic value
 
-    merged_data['commodity_index'] = (merged_data.iloc[:, 0] / base_commodity_value) * 100
-    merged_data['economic_index'] = (merged_data['value'] / base_economic_value) * 100
+def compare_to_economic_indicators(commodity_data, economic_series_id, plot: bool = True, memoize: bool = True,
+                                   publication_lag: int = 0, frequency: Optional[str] = None):
+    """
+    Compares commodity data to a selected economic indicator.
+    Args:
+    - commodity_data (pd.DataFrame or PriceSeries): Commodity prices with dates as index.
+    - economic_series_id (str): The FRED series ID to compare against.
+    - plot (bool): Whether to display the comparison plot.
+    - memoize (bool): Reuse the result of an identical earlier call for up to `INDICATOR_RESULT_TTL`
+      seconds; the returned frame is then shared and must not be modified.
+    - publication_lag (int): Days between an observation's date and its release; each value is
+      only used from its release on.
+    - frequency (str): Compare on the last trading day of every 'W', 'M', 'Q' or 'Y' instead of daily.
 
-    def quarter_format(x, pos=None):
-        date = mdates.num2date(x)
-        return f"{date.year}-Q{(date.month-1)//3 + 1}"
+    Returns:
+    - pd.DataFrame: The aligned commodity and indicator values rebased to 100, or None if nothing overlaps.
+    """
+    commodity_data = as_price_series(commodity_data)
+    compute = lambda: _indicator_comparison(commodity_data, economic_series_id, publication_lag, frequency)
+    if memoize:
+        params = (economic_series_id, publication_lag, frequency)
+        merged_data = get_result_cache().get_or_compute('indicator', commodity_data, None, None, params, compute,
+                                                        ttl=INDICATOR_RESULT_TTL)
+    else:
+        merged_data = compute()
 
-    fig, ax = plt.subplots(figsize=(15, 8))
-    ax.plot(merged_data.index, merged_data['commodity_index'], label='Commodity Price Index', color='blue')
-    ax.plot(merged_data.index, merged_data['economic_index'], label=f'{economic_series_id} Indicator Index', color='orange')
+    if merged_data is None:
+        return
 
-    ax.xaxis.set_major_locator(mdates.MonthLocator(bymonth=[1, 4, 7, 10]))
-    ax.xaxis.set_major_formatter(FuncFormatter(quarter_format))
-    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+    if plot:
+        from rendering import plot_indicator_comparison
+        plot_indicator_comparison(merged_data, economic_series_id)
 
-    fig.autofmt_xdate()
+    return merged_data
 
-    ax.xaxis.set_minor_locator(mdates.MonthLocator())
-    ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
 
-    plt.xlabel('Date')
-    plt.ylabel('Index Value')
-    plt.title(f'Commodity Price Index vs {economic_series_id} Indicator Index (Base = 100)')
-    plt.legend()
-    plt.grid(which='major')
-    plt.tight_layout()
-    plt.show()
+if __name__ == "__main__":
+    main()
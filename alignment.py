@@ -0,0 +1,190 @@
+"""
+As-of alignment of economic indicators of any frequency onto a commodity's trading calendar.
+
+Every calendar date takes the last indicator value that was known on that date. Indicator
+observations are sorted once and placed with a single `searchsorted` each, so monthly CPI,
+quarterly GDP and weekly claims go onto a daily calendar in one pass. FRED dates an observation
+by the start of its period, long before it is published; a publication lag (in days) moves each
+observation to the date it became available, so no value is used before it was released.
+
+`align_indicators` returns an `AlignedIndicators`, which keeps the aligned panel and computes
+each rebased comparison at most once, so plots and correlations can share it.
+"""
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from price_series import as_price_series
+
+_NS_PER_DAY = 86_400 * 10 ** 9
+
+
+def _date_column(economic_data: pd.DataFrame) -> str:
+    date_col = next((col for col in economic_data.columns if str(col).lower() == 'date'), None)
+    if date_col is None:
+        raise KeyError(f"No 'date' column found in economic data. Available columns: {economic_data.columns}")
+    if 'value' not in economic_data.columns:
+        raise KeyError(f"No 'value' column found in economic data. Available columns: {economic_data.columns}")
+    return date_col
+
+
+def observations(economic_data: pd.DataFrame, lag_days: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns an indicator's observations as (datetime64[ns] availability dates, float64 values),
+    sorted by date and without missing values.
+
+    Args:
+    - economic_data (pd.DataFrame): A date column and a 'value' column, as returned by
+      `data_fetcher.get_economic_data`.
+    - lag_days (int): Days between an observation's date and its publication.
+    """
+    dates = economic_data[_date_column(economic_data)]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    dates = dates.to_numpy(dtype='datetime64[ns]')
+    values = pd.to_numeric(economic_data['value'], errors='coerce').to_numpy(dtype=np.float64)
+
+    present = ~np.isnan(values)
+    dates, values = dates[present], values[present]
+    order = np.argsort(dates, kind='stable')
+    dates, values = dates[order], values[order]
+    if lag_days:
+        dates = dates + np.timedelta64(lag_days * _NS_PER_DAY, 'ns')
+    return dates, values
+
+
+def asof(dates: np.ndarray, values: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Returns for every `target` date the last of `values` dated on or before it, NaN before the first.
+
+    `dates` must be sorted; `dates` and `target` must have the same datetime64 unit.
+    """
+    idx = np.searchsorted(dates, target, side='right') - 1
+    out = np.full(len(target), np.nan)
+    found = idx >= 0
+    out[found] = values[idx[found]]
+    return out
+
+
+def period_ends(dates: pd.DatetimeIndex, frequency: str) -> np.ndarray:
+    """
+    Returns the positions of the last date of every period (e.g. 'W', 'M', 'Q', 'Y') in sorted `dates`.
+    """
+    if len(dates) == 0:
+        return np.empty(0, dtype=np.intp)
+    periods = dates.to_period(frequency).asi8
+    return np.flatnonzero(np.r_[periods[1:] != periods[:-1], True])
+
+
+def indicator_lag(lags: Union[None, int, Mapping[str, int]], series_id: str) -> int:
+    """
+    Returns the publication lag in days of `series_id` from a lag for all indicators or a dict per series ID.
+    """
+    if lags is None:
+        return 0
+    if isinstance(lags, Mapping):
+        return int(lags.get(series_id, 0))
+    return int(lags)
+
+
+class AlignedIndicators:
+    """
+    A commodity and any number of indicators on one calendar.
+
+    Args:
+    - calendar (pd.DatetimeIndex): The aligned dates.
+    - commodity (np.ndarray): The commodity's price on every calendar date.
+    - panel (np.ndarray): Calendar x indicators values, NaN before an indicator's first known value.
+    - columns (list): The indicator labels, in panel order.
+    - name (str): The commodity's price column.
+
+    The rebased comparisons are computed on first use and kept; treat all results as read-only.
+    """
+
+    def __init__(self, calendar: pd.DatetimeIndex, commodity: np.ndarray, panel: np.ndarray, columns, name: str):
+        self.calendar = calendar
+        self.commodity = commodity
+        self.values = panel
+        self.columns = list(columns)
+        self.name = name
+        self._frame = None
+        self._comparisons: Dict[str, pd.DataFrame] = {}
+
+    def __len__(self) -> int:
+        return len(self.calendar)
+
+    @property
+    def panel(self) -> pd.DataFrame:
+        """
+        The indicators as a DataFrame indexed by the calendar, one float64 column each.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.values, index=self.calendar, columns=self.columns)
+        return self._frame
+
+    def comparison(self, series_id: str) -> pd.DataFrame:
+        """
+        Returns the commodity and one indicator from the indicator's first known value on, with
+        both rebased to 100 on that date.
+
+        Returns:
+        - pd.DataFrame: Columns: the commodity price, 'value', 'commodity_index' and
+          'economic_index'; empty if the two do not overlap.
+        """
+        merged = self._comparisons.get(series_id)
+        if merged is None:
+            value = self.values[:, self.columns.index(series_id)]
+            rows = ~np.isnan(value)
+            price, value = self.commodity[rows], value[rows]
+            merged = pd.DataFrame({self.name: price, 'value': value}, index=self.calendar[rows])
+            if len(merged):
+                merged['commodity_index'] = price / price[0] * 100
+                merged['economic_index'] = value / value[0] * 100
+            self._comparisons[series_id] = merged
+        return merged
+
+    def rebased(self) -> pd.DataFrame:
+        """
+        Returns the commodity and every indicator rebased to 100 on the first date all of them are known.
+        """
+        rows = ~np.isnan(self.values).any(axis=1)
+        if not rows.any():
+            return pd.DataFrame(columns=[self.name] + self.columns, dtype=np.float64)
+        first = np.argmax(rows)
+        values = np.column_stack([self.commodity, self.values])[first:]
+        return pd.DataFrame(values / values[0] * 100, index=self.calendar[first:], columns=[self.name] + self.columns)
+
+
+@instrumentation.timed('alignment.align_indicators')
+def align_indicators(commodity_data, indicator_frames: Mapping[str, pd.DataFrame],
+                     lags: Union[None, int, Mapping[str, int]] = None,
+                     frequency: Optional[str] = None) -> AlignedIndicators:
+    """
+    Puts many indicators onto the commodity's trading calendar with an as-of merge.
+
+    Args:
+    - commodity_data (PriceSeries or pd.DataFrame): Commodity prices; not modified.
+    - indicator_frames (dict): Series ID -> DataFrame with a date column and a 'value' column.
+    - lags (int or dict): Publication lag in days, for all indicators or per series ID.
+    - frequency (str): Downsample the commodity first, keeping the last trading day of every
+      period ('W', 'M', 'Q', 'Y'), e.g. to compare at the indicator's own frequency.
+
+    Returns:
+    - AlignedIndicators: The aligned calendar, prices and indicator panel.
+    """
+    commodity = as_price_series(commodity_data)
+    calendar = pd.DatetimeIndex(commodity.dates.astype('datetime64[ns]'), name='Date')
+    close = commodity.close.astype(np.float64)
+    if frequency is not None:
+        ends = period_ends(calendar, frequency)
+        calendar, close = calendar[ends], close[ends]
+
+    target = calendar.values
+    panel = np.full((len(calendar), len(indicator_frames)), np.nan)
+    for j, (series_id, economic_data) in enumerate(indicator_frames.items()):
+        dates, values = observations(economic_data, indicator_lag(lags, series_id))
+        panel[:, j] = asof(dates, values, target)
+
+    return AlignedIndicators(calendar, close, panel, indicator_frames.keys(), commodity.name or 'Close')
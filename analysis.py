@@ -0,0 +1,276 @@
+from functools import reduce
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from alignment import align_indicators
+from investment_engine import periodic_investment_growth
+from price_series import PriceSeries, as_price_series
+
+ROLLING_WINDOW = 30
+
+
+@instrumentation.timed('analysis.rolling_statistics')
+def _price_statistics(df: pd.DataFrame, analytics=None, rolling_window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """
+    Adds the rolling mean/std and daily returns used by both analyses to a price frame.
+
+    With an `IncrementalAnalytics` engine holding exactly the frame's prices the values are read
+    from its history instead of being recomputed. The frame's first rows are blanked as the
+    recomputation would leave them, so both give the same result.
+    """
+    if analytics is not None:
+        stats = analytics.frame(df.index[0], df.index[-1]).reindex(df.index)
+        for column in ('Rolling_Mean', 'Rolling_STD', 'Daily_Returns'):
+            df[column] = stats[column].to_numpy()
+        df.iloc[:rolling_window - 1, df.columns.get_indexer(['Rolling_Mean', 'Rolling_STD'])] = np.nan
+        df.iloc[:1, df.columns.get_loc('Daily_Returns')] = np.nan
+        return df
+
+    prices = df.iloc[:, 0]
+    df['Rolling_Mean'] = prices.rolling(window=rolling_window).mean()
+    df['Rolling_STD'] = prices.rolling(window=rolling_window).std()
+    df['Daily_Returns'] = prices.pct_change() * 100
+    return df
+
+
+@instrumentation.timed('analysis.monthly_returns')
+def monthly_return_table(df: pd.DataFrame, analytics=None) -> pd.DataFrame:
+    """
+    Returns the Year x Month table of mean daily returns for a frame with a 'Daily_Returns' column.
+
+    With an `IncrementalAnalytics` engine holding the frame's prices the full months are read
+    from its monthly buckets; the first and last month, which the frame may only partly cover,
+    are computed from the frame itself.
+    """
+    years, months = df.index.year, df.index.month
+    if analytics is not None and len(df):
+        cells = dict(analytics.monthly_returns(df.index[0], df.index[-1]).stack().items())
+        for year, month in {(years[0], months[0]), (years[-1], months[-1])}:
+            values = df['Daily_Returns'][(years == year) & (months == month)].dropna()
+            if len(values):
+                cells[(year, month)] = values.mean()
+            else:
+                cells.pop((year, month), None)
+        if cells:
+            table = pd.Series(list(cells.values()), index=pd.MultiIndex.from_tuples(list(cells.keys())))
+            table.index = table.index.set_levels([level.astype(years.dtype) for level in table.index.levels])
+            table.index.names = ['Year', 'Month']
+            return table.unstack('Month').sort_index().sort_index(axis=1)
+
+    returns = df[['Daily_Returns']].copy()
+    returns['Month'] = months
+    returns['Year'] = years
+    return returns.pivot_table(values='Daily_Returns', index='Year', columns='Month', aggfunc='mean')
+
+
+@instrumentation.timed('analysis.investment')
+def investment_analysis(prices, start_date: str, initial_investment: float = 100,
+                        end_date: str = None, analytics=None) -> Dict[str, Any]:
+    """
+    Computes the outcome of a single investment made on `start_date`.
+
+    `prices` is a PriceSeries or a price frame indexed by date; frames are not modified.
+    `analytics` is an optional `IncrementalAnalytics` engine holding the same prices; when given,
+    the rolling statistics and monthly returns come from it instead of being recomputed.
+
+    Returns:
+    - dict: 'metrics' (start/end date, initial investment, final, min and max value, total and
+      annualized return), 'series' (price, investment value, rolling statistics and daily returns)
+      and 'monthly_returns' (Year x Month mean daily returns).
+    """
+    start_date = pd.to_datetime(start_date, format='%d-%m-%Y')
+
+    if end_date is None:
+        end_date = pd.to_datetime('today')
+    else:
+        end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
+
+    window = as_price_series(prices).slice(start_date, end_date)
+
+    if len(window) == 0:
+        raise ValueError("No data available in the specified date range.")
+
+    close = window.close.astype(np.float64)
+    units_bought = initial_investment / close[0]
+    investment_value = close * units_bought
+
+    final_value = investment_value[-1]
+    total_return = final_value - initial_investment
+    years = (end_date - start_date).days / 365.25
+    annualized_return = (final_value / initial_investment) ** (1 / years) - 1 if years > 0 else 0
+
+    df_filtered = window.to_frame()
+    df_filtered['Investment_Value'] = investment_value
+    _price_statistics(df_filtered, analytics)
+
+    return {
+        'metrics': {
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_investment': initial_investment,
+            'final_value': final_value,
+            'min_value': investment_value.min(),
+            'max_value': investment_value.max(),
+            'total_return': total_return,
+            'annualized_return': annualized_return,
+        },
+        'series': df_filtered,
+        'monthly_returns': monthly_return_table(df_filtered, analytics),
+    }
+
+
+@instrumentation.timed('analysis.periodic_investment')
+def periodic_investment_analysis(prices, start_date: str, end_date: str, interval_days: int,
+                                 investment_amount: float, alignment: str = 'next', analytics=None) -> Dict[str, Any]:
+    """
+    Computes the outcome of investing `investment_amount` every `interval_days`.
+
+    `prices` and `analytics` are used as in `investment_analysis`.
+
+    Returns:
+    - dict: 'metrics' (total invested, units bought, final value, total and annualized return),
+      'series' (price with rolling statistics and daily returns), 'growth' (value and invested
+      capital after every investment) and 'monthly_returns'.
+    """
+    start_date = pd.to_datetime(start_date, format='%d-%m-%Y')
+    end_date = pd.to_datetime(end_date, format='%d-%m-%Y')
+
+    window = as_price_series(prices).slice(start_date, end_date)
+
+    if len(window) == 0:
+        raise ValueError("Belirtilen tarih aralığı için veri bulunamadı.")
+
+    with instrumentation.span('analysis.dca'):
+        growth = periodic_investment_growth(window.dates, window.close, start_date, end_date,
+                                            interval_days, investment_amount, alignment)
+    if len(growth['Date']) == 0:
+        raise ValueError("No investment date could be mapped onto the available data.")
+
+    growth_df = pd.DataFrame({'Value': growth['Value'], 'Total_Invested': growth['Total_Invested']},
+                             index=pd.DatetimeIndex(growth['Date'].astype('datetime64[ns]'), name='Date'))
+
+    total_invested = growth['total_invested']
+    final_value = growth['final_value']
+    total_return = final_value - total_invested
+    years = (end_date - start_date).days / 365.25
+    annualized_return = (final_value / total_invested) ** (1 / years) - 1 if years > 0 else 0
+
+    df = window.to_frame()
+    _price_statistics(df, analytics)
+
+    return {
+        'metrics': {
+            'start_date': start_date,
+            'end_date': end_date,
+            'interval_days': interval_days,
+            'investment_amount': investment_amount,
+            'total_invested': total_invested,
+            'units_bought': growth['units_bought'],
+            'final_value': final_value,
+            'total_return': total_return,
+            'annualized_return': annualized_return,
+        },
+        'series': df,
+        'growth': growth_df,
+        'monthly_returns': monthly_return_table(df, analytics),
+    }
+
+
+@instrumentation.timed('analysis.aligned_panel')
+def aligned_panel(series: Dict[str, PriceSeries]) -> pd.DataFrame:
+    """
+    Joins several price series on the dates they all share.
+
+    Args:
+    - series (dict): Column label -> PriceSeries (or price frame).
+
+    Returns:
+    - pd.DataFrame: Indexed by 'Date', one float64 column per series, only dates present in all of them.
+    """
+    series = {label: as_price_series(prices) for label, prices in series.items()}
+    common_days = reduce(np.intersect1d, (prices.days for prices in series.values()))
+
+    panel = np.empty((len(common_days), len(series)))
+    for j, prices in enumerate(series.values()):
+        panel[:, j] = prices.close[np.searchsorted(prices.days, common_days)]
+
+    index = pd.DatetimeIndex(common_days.view('datetime64[D]').astype('datetime64[ns]'), name='Date')
+    return pd.DataFrame(panel, index=index, columns=list(series.keys()))
+
+
+@instrumentation.timed('analysis.instrument_comparison')
+def instrument_comparison(panel: pd.DataFrame, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
+    """
+    Compares the instruments of an aligned panel (see `aligned_panel`) between two dates.
+
+    Returns:
+    - dict: 'metrics' (total and annualized return and annualized volatility per instrument, in
+      percent), 'panel' (the prices in range), 'series' (prices normalized to 100 at the first
+      date), 'daily_returns', 'ratios' (every pairwise price ratio, e.g. 'Gold / Silver') and
+      'correlation' (correlation matrix of the daily returns).
+    """
+    start = None if start_date is None else pd.to_datetime(start_date, format='%d-%m-%Y')
+    end = None if end_date is None else pd.to_datetime(end_date, format='%d-%m-%Y')
+    panel = panel.loc[start:end]
+
+    if panel.empty:
+        raise ValueError("No data available in the specified date range.")
+
+    values = panel.to_numpy(dtype=np.float64)
+    labels = list(panel.columns)
+
+    normalized = values / values[0] * 100
+    daily_returns = np.full_like(values, np.nan)
+    daily_returns[1:] = (values[1:] / values[:-1] - 1) * 100
+
+    numerator, denominator = np.triu_indices(len(labels), 1)
+    ratios = values[:, numerator] / values[:, denominator]
+    ratio_labels = [f"{labels[i]} / {labels[j]}" for i, j in zip(numerator, denominator)]
+
+    if len(values) > 2:
+        correlation = np.atleast_2d(np.corrcoef(daily_returns[1:], rowvar=False))
+    else:
+        correlation = np.full((len(labels), len(labels)), np.nan)
+
+    total_return = (values[-1] / values[0] - 1) * 100
+    years = (panel.index[-1] - panel.index[0]).days / 365.25
+    annualized_return = ((values[-1] / values[0]) ** (1 / years) - 1) * 100 if years > 0 else np.zeros(len(labels))
+    volatility = np.nanstd(daily_returns[1:], axis=0, ddof=1) * np.sqrt(252) if len(values) > 2 else np.full(len(labels), np.nan)
+
+    return {
+        'metrics': {
+            'start_date': panel.index[0],
+            'end_date': panel.index[-1],
+            'total_return': pd.Series(total_return, index=labels),
+            'annualized_return': pd.Series(annualized_return, index=labels),
+            'volatility': pd.Series(volatility, index=labels),
+        },
+        'panel': panel,
+        'series': pd.DataFrame(normalized, index=panel.index, columns=labels),
+        'daily_returns': pd.DataFrame(daily_returns, index=panel.index, columns=labels),
+        'ratios': pd.DataFrame(ratios, index=panel.index, columns=ratio_labels),
+        'correlation': pd.DataFrame(correlation, index=labels, columns=labels),
+    }
+
+
+@instrumentation.timed('analysis.indicator_comparison')
+def indicator_comparison(commodity_data, economic_data: pd.DataFrame, lag_days: int = 0,
+                         frequency: str = None) -> pd.DataFrame:
+    """
+    Aligns an economic indicator onto the commodity's dates and rebases both to 100.
+
+    Args:
+    - commodity_data (PriceSeries or pd.DataFrame): Commodity prices with dates as index; not modified.
+    - economic_data (pd.DataFrame): Indicator values with a date column and a 'value' column.
+    - lag_days (int): Publication lag of the indicator, see `alignment.align_indicators`.
+    - frequency (str): Compare on the last trading day of every period ('W', 'M', 'Q', 'Y') instead of daily.
+
+    Returns:
+    - pd.DataFrame: The merged frame with 'commodity_index' and 'economic_index' columns, empty if
+      the two series do not overlap.
+    """
+    aligned = align_indicators(commodity_data, {'value': economic_data}, lag_days, frequency)
+    return aligned.comparison('value')
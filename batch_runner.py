@@ -0,0 +1,306 @@
+"""
+Unattended batch runs of many analyses described in a job file.
+
+Every instrument is fetched once, concurrently, and its prices are copied into one shared
+memory block; the jobs run on a process pool whose workers read the prices from that block
+without copying. Jobs needing an instrument that could not be fetched are recorded as errors
+and the rest still run.
+The metrics of all jobs are written to a single results file.
+
+Job file (JSON, or YAML when PyYAML is installed):
+
+    {
+      "defaults": {"start_date": "01-01-2005", "end_date": "01-01-2024"},
+      "jobs": [
+        {"type": "investment", "commodity": "gold", "initial_investment": 1000},
+        {"type": "periodic", "commodity": "silver", "interval_days": 30, "investment_amount": 100},
+        {"type": "comparison", "instruments": ["gold", "silver", "XPT/USD"]},
+        {"type": "indicator", "commodity": "gold", "series_id": "CPIAUCSL"}
+      ]
+    }
+
+Every job may have a "name"; dates are dd-mm-yyyy and any field can be set in "defaults".
+Indicator jobs also take "publication_lag" (days) and "frequency" ('W', 'M', 'Q' or 'Y').
+"""
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from analysis import (aligned_panel, indicator_comparison, instrument_comparison, investment_analysis,
+                      periodic_investment_analysis)
+from exporters import export, to_jsonable
+from price_series import PriceSeries, to_epoch_day
+
+JOB_TYPES = ('investment', 'periodic', 'comparison', 'indicator')
+
+# Jobs handed to a worker at a time.
+JOBS_PER_TASK = 16
+
+_prices: Dict[str, PriceSeries] = {}
+_indicators: Dict[str, pd.DataFrame] = {}
+_shm = None
+
+
+def load_jobs(path: str) -> Dict[str, Any]:
+    """
+    Reads a job file and applies its defaults to every job.
+
+    Returns:
+    - dict: The job file with 'jobs' as a list of complete job dicts.
+    """
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("YAML job files need PyYAML: pip install pyyaml") from e
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    defaults = spec.get('defaults', {})
+    jobs = []
+    for i, job in enumerate(spec.get('jobs', [])):
+        job = {**defaults, **job}
+        job.setdefault('name', f"job-{i:04d}")
+        if job.get('type') not in JOB_TYPES:
+            raise ValueError(f"{job['name']}: unknown job type {job.get('type')!r}. Use one of {', '.join(JOB_TYPES)}.")
+        if 'start_date' not in job:
+            raise ValueError(f"{job['name']}: no start_date.")
+        jobs.append(job)
+    return {**spec, 'jobs': jobs}
+
+
+def _instruments(job: Dict[str, Any]) -> List[str]:
+    return list(job['instruments']) if job['type'] == 'comparison' else [job['commodity']]
+
+
+def _share(prices: Dict[str, PriceSeries]) -> Tuple[shared_memory.SharedMemory, Dict[str, tuple]]:
+    """
+    Copies all price series into one shared memory block: every series' epoch days followed by its closes.
+
+    Returns the block and the layout: key -> (offset in bytes, length, series name).
+    """
+    size = sum(series.nbytes for series in prices.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layout, offset = {}, 0
+    for key, series in prices.items():
+        n = len(series)
+        np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=offset)[:] = series.days
+        np.ndarray(n, dtype=np.float64, buffer=shm.buf, offset=offset + 8 * n)[:] = series.close
+        layout[key] = (offset, n, series.name)
+        offset += 16 * n
+    return shm, layout
+
+
+def _map(shm: shared_memory.SharedMemory, layout: Dict[str, tuple], indicators: Dict[str, pd.DataFrame]):
+    """
+    Exposes the shared price block as PriceSeries views in this process.
+    """
+    _prices.clear()
+    for key, (offset, n, name) in layout.items():
+        days = np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=offset)
+        close = np.ndarray(n, dtype=np.float64, buffer=shm.buf, offset=offset + 8 * n)
+        _prices[key] = PriceSeries(days, close, name)
+    _indicators.clear()
+    _indicators.update(indicators)
+
+
+def _attach(shm_name: str, layout: Dict[str, tuple], indicators: Dict[str, pd.DataFrame]):
+    """
+    Worker initializer: attaches to the shared price block created by `run_batch`.
+    """
+    global _shm
+    try:
+        _shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker, which then
+        # unlinks it when the worker exits; the block belongs to `run_batch`, so skip that.
+        from multiprocessing import resource_tracker
+
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            _shm = shared_memory.SharedMemory(name=shm_name)
+        finally:
+            resource_tracker.register = register
+    _map(_shm, layout, indicators)
+
+
+def _flatten(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the metrics as JSON values, one column each: a Series (e.g. per instrument) becomes
+    one 'metric.label' entry per label.
+    """
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, pd.Series):
+            flat.update({f"{key}.{label}": to_jsonable(v) for label, v in value.items()})
+        else:
+            flat[key] = to_jsonable(value)
+    return flat
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs one job against the prices of this process and returns its flattened metrics.
+    """
+    kind = job['type']
+    start_date, end_date = job['start_date'], job.get('end_date')
+
+    if kind == 'investment':
+        result = investment_analysis(_prices[job['commodity']], start_date, job.get('initial_investment', 100), end_date)
+        return _flatten(result['metrics'])
+
+    if kind == 'periodic':
+        series = _prices[job['commodity']]
+        result = periodic_investment_analysis(series, start_date, end_date or series.last_date.strftime('%d-%m-%Y'),
+                                              job['interval_days'], job['investment_amount'],
+                                              job.get('alignment', 'next'))
+        return _flatten(result['metrics'])
+
+    if kind == 'comparison':
+        panel = aligned_panel({name: _prices[name] for name in job['instruments']})
+        result = instrument_comparison(panel, start_date, end_date)
+        metrics = _flatten(result['metrics'])
+        correlation = result['correlation']
+        for i, a in enumerate(correlation.index):
+            for b in correlation.columns[i + 1:]:
+                metrics[f"correlation.{a} / {b}"] = float(correlation.loc[a, b])
+        return metrics
+
+    economic_data = _indicators.get(job['series_id'])
+    if economic_data is None or economic_data.empty:
+        raise ValueError(f"No data for FRED series {job['series_id']}.")
+    merged = indicator_comparison(_prices[job['commodity']].slice(start_date, end_date), economic_data,
+                                  job.get('publication_lag', 0), job.get('frequency'))
+    if merged.empty:
+        raise ValueError(f"No overlapping data between {job['commodity']} and {job['series_id']}.")
+    return {
+        'start_date': merged.index[0].strftime('%Y-%m-%d'),
+        'end_date': merged.index[-1].strftime('%Y-%m-%d'),
+        'commodity_return': float(merged['commodity_index'].iloc[-1] - 100),
+        'indicator_return': float(merged['economic_index'].iloc[-1] - 100),
+        'spearman': float(merged['commodity_index'].corr(merged['economic_index'], method='spearman')),
+    }
+
+
+def _record(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the result row of a job with its parameters, before it has run.
+    """
+    record = {'name': job['name'], 'type': job['type'], 'status': 'ok', 'error': None}
+    record.update({key: value if not isinstance(value, list) else ','.join(map(str, value))
+                   for key, value in job.items() if key not in ('name', 'type')})
+    return record
+
+
+def _run_task(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    records = []
+    for job in jobs:
+        record = _record(job)
+        try:
+            record.update(run_job(job))
+        except Exception as e:
+            record.update(status='error', error=f"{type(e).__name__}: {e}")
+        records.append(record)
+    return records
+
+
+def _fetch_indicators(jobs: List[Dict[str, Any]], prices: Dict[str, PriceSeries]) -> Dict[str, pd.DataFrame]:
+    """
+    Fetches every indicator of the jobs once, over the span of all prices.
+
+    The start is moved back by the largest publication lag, so the value already published on
+    the first price date is included, as in `CIT._fetch_window`.
+    """
+    indicator_jobs = [job for job in jobs if job['type'] == 'indicator']
+    series_ids = sorted({job['series_id'] for job in indicator_jobs})
+    if not series_ids:
+        return {}
+    from data_fetcher import fetch_economic_data
+
+    max_lag = max(int(job.get('publication_lag', 0) or 0) for job in indicator_jobs)
+    first = min(series.first_date for series in prices.values() if len(series)) - pd.Timedelta(days=max_lag)
+    last = max(series.last_date for series in prices.values() if len(series))
+    frames, _ = fetch_economic_data(series_ids, start_date=first.strftime('%Y-%m-%d'), end_date=last.strftime('%Y-%m-%d'))
+    return frames
+
+
+def run_batch(job_file: str, output: Optional[str] = None, processes: Optional[int] = None,
+              tracker=None) -> pd.DataFrame:
+    """
+    Runs every job of a job file and writes all results to one file.
+
+    Args:
+    - job_file (str): JSON or YAML job file, see the module docstring.
+    - output (str): Results file (.jsonl, .csv, .parquet, ...); defaults to the file's "output"
+      entry or `<job file>.results.jsonl`.
+    - processes (int): Worker processes; defaults to the file's "processes" entry or the CPU count.
+    - tracker (CommodityInvestmentTracker): Used to fetch the prices; a default one if None.
+
+    Returns:
+    - pd.DataFrame: One row per job with its parameters, status and metrics.
+    """
+    from CIT import CommodityInvestmentTracker
+
+    spec = load_jobs(job_file)
+    jobs = spec['jobs']
+    output = output or spec.get('output') or os.path.splitext(job_file)[0] + '.results.jsonl'
+    processes = processes or spec.get('processes') or os.cpu_count() or 1
+    tracker = tracker or CommodityInvestmentTracker()
+
+    earliest: Dict[str, int] = {}
+    for job in jobs:
+        for name in _instruments(job):
+            earliest[name] = min(earliest.get(name, to_epoch_day(job['start_date'])), to_epoch_day(job['start_date']))
+
+    with instrumentation.span('batch.fetch'):
+        prices, failures = tracker.fetch_price_series(
+            {name: pd.Timestamp(np.datetime64(day, 'D')).strftime('%d-%m-%Y') for name, day in earliest.items()})
+        # Jobs needing an instrument that could not be fetched fail on their own; the rest still run.
+        failed_jobs = {}
+        for i, job in enumerate(jobs):
+            missing = [name for name in _instruments(job) if name in failures]
+            if missing:
+                failed_jobs[i] = _record(job)
+                failed_jobs[i].update(status='error', error="; ".join(
+                    f"Could not fetch {name}: {type(failures[name]).__name__}: {failures[name]}" for name in missing))
+        if failures:
+            logging.warning(f"Failed to fetch {len(failures)} instrument(s), skipping {len(failed_jobs)} job(s): "
+                            + ", ".join(failures))
+        runnable = [job for i, job in enumerate(jobs) if i not in failed_jobs]
+        indicators = _fetch_indicators(runnable, prices) if prices else {}
+
+    logging.info(f"Running {len(runnable)} jobs over {len(prices)} instruments with {processes} worker(s).")
+    shm, layout = _share(prices)
+    try:
+        chunks = [runnable[i:i + JOBS_PER_TASK] for i in range(0, len(runnable), JOBS_PER_TASK)]
+        with instrumentation.span('batch.run'):
+            if processes == 1 or len(chunks) <= 1:
+                _map(shm, layout, indicators)
+                records = [record for chunk in chunks for record in _run_task(chunk)]
+            else:
+                with ProcessPoolExecutor(max_workers=min(processes, len(chunks)), initializer=_attach,
+                                         initargs=(shm.name, layout, indicators)) as executor:
+                    records = [record for batch in executor.map(_run_task, chunks) for record in batch]
+    finally:
+        _prices.clear()
+        _indicators.clear()
+        shm.close()
+        shm.unlink()
+
+    # Back into job file order.
+    records = iter(records)
+    results = pd.DataFrame([failed_jobs[i] if i in failed_jobs else next(records) for i in range(len(jobs))])
+    export(results, output)
+    failed = int((results['status'] != 'ok').sum()) if len(results) else 0
+    logging.info(f"Wrote {len(results)} results to {output} ({failed} failed).")
+    return results
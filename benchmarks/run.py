@@ -0,0 +1,196 @@
+"""
+Offline benchmark suite.
+
+Runs the main code paths against local stand-ins for fxempire (`StubCandleServer`) and FRED
+(`FakeFred`), so no network access or API key is needed, and reports wall time, peak traced
+memory and throughput per scenario.
+
+Usage (from the repository root):
+    python -m benchmarks.run --years 20 --indicators 100
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.25
+
+With `--baseline` the exit status is 1 when any scenario is slower (or uses more memory) than
+the baseline by more than `--tolerance`.
+"""
+import argparse
+import gc
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import data_fetcher
+from CIT import CommodityInvestmentTracker
+from benchmarks.stubs import FakeFred, StubCandleServer
+
+SCENARIOS = ('fetch_parse', 'single_analysis', 'periodic_analysis', 'comparison', 'correlation')
+
+COMPARED_INSTRUMENTS = ['gold', 'silver', 'platinum', 'palladium']
+
+
+def _start_date(years: int) -> str:
+    return (pd.Timestamp.today().normalize() - pd.DateOffset(years=years)).strftime('%d-%m-%Y')
+
+
+def _tracker(server: StubCandleServer) -> CommodityInvestmentTracker:
+    # The result cache would turn every repeat after the first into a lookup.
+    tracker = CommodityInvestmentTracker(store_path=None, memoize=False)
+    tracker.downloader.base_url = server.url
+    return tracker
+
+
+def build_scenarios(server: StubCandleServer, years: int, indicators: int) -> Dict[str, Callable[[], Tuple[Callable, int, str]]]:
+    """
+    Returns scenario name -> setup function. A setup prepares its inputs outside the measurement
+    and returns (the callable to time, units of work per call, unit name).
+    """
+    start_date = _start_date(years)
+
+    def fetch_parse():
+        def run():
+            return _tracker(server).get_price_series(start_date, 'gold')
+        return run, len(run()), 'candles'
+
+    def single_analysis():
+        tracker = _tracker(server)
+        series = tracker.get_price_series(start_date, 'gold')
+        return (lambda: tracker.analyze_investment(series, start_date, 100, plot=False)), len(series), 'candles'
+
+    def periodic_analysis():
+        tracker = _tracker(server)
+        series = tracker.get_price_series(start_date, 'gold')
+        end_date = series.last_date.strftime('%d-%m-%Y')
+        return (lambda: tracker.analyze_and_plot_periodic_investment(series, start_date, end_date, 30, 100,
+                                                                     'gold', plot=False)), len(series), 'candles'
+
+    def comparison():
+        def run():
+            return _tracker(server).compare_instruments(COMPARED_INSTRUMENTS, start_date, plot=False)
+        return run, len(run()['panel']) * len(COMPARED_INSTRUMENTS), 'candles'
+
+    def correlation():
+        data_fetcher.set_fred_client(FakeFred())
+        commodity = _tracker(server).get_commodity_data(start_date, 'gold')
+        series_ids = [f"IND{i:05d}" for i in range(indicators)]
+        return (lambda: data_fetcher.calculate_monotonic_relationships(commodity, series_ids, use_cache=False),
+                indicators, 'indicators')
+
+    return {'fetch_parse': fetch_parse, 'single_analysis': single_analysis, 'periodic_analysis': periodic_analysis,
+            'comparison': comparison, 'correlation': correlation}
+
+
+def measure(run: Callable, repeat: int) -> Dict[str, float]:
+    """
+    Times `repeat` untraced calls (the median is reported) and one call under tracemalloc for the peak.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'wall_s': statistics.median(timings), 'best_s': min(timings), 'peak_mb': peak / 2 ** 20}
+
+
+def run_benchmarks(years: int, indicators: int, scenarios: List[str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    with StubCandleServer() as server:
+        setups = build_scenarios(server, years, indicators)
+        for name in scenarios:
+            run, units, unit = setups[name]()
+            stats = measure(run, repeat)
+            stats['throughput'] = units / stats['wall_s'] if stats['wall_s'] else float('inf')
+            stats['unit'] = f"{unit}/s"
+            results[name] = stats
+            print(f"{name:<18} {stats['wall_s'] * 1000:10.1f} ms {stats['peak_mb']:9.1f} MB "
+                  f"{stats['throughput']:14,.0f} {stats['unit']}")
+
+    return {
+        'meta': {
+            'years': years,
+            'indicators': indicators,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Returns a message for every scenario whose wall time or peak memory exceeds the baseline by more than `tolerance`.
+    """
+    for size in ('years', 'indicators'):
+        if report['meta'][size] != baseline['meta'].get(size):
+            logging.warning(f"Baseline was recorded with {size}={baseline['meta'].get(size)}, "
+                            f"this run used {report['meta'][size]}; comparison may be meaningless.")
+
+    regressions = []
+    for name, stats in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for metric in ('wall_s', 'peak_mb'):
+            ratio = stats[metric] / reference[metric] if reference[metric] else 1.0
+            print(f"{name:<18} {metric:<8} {ratio:6.2f}x baseline")
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} {metric}: {stats[metric]:.4g} vs baseline {reference[metric]:.4g}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline CIT benchmarks")
+    parser.add_argument("--years", type=int, default=20, help="Years of daily prices (10 to 50)")
+    parser.add_argument("--indicators", type=int, default=100, help="Number of FRED indicators to correlate (10 to 5000)")
+    parser.add_argument("--scenarios", nargs='+', choices=SCENARIOS, default=list(SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline to this file")
+    parser.add_argument("--baseline", help="Compare against the baseline in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    if not 10 <= args.years <= 50:
+        parser.error("--years must be between 10 and 50")
+    if not 10 <= args.indicators <= 5000:
+        parser.error("--indicators must be between 10 and 5000")
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run_benchmarks(args.years, args.indicators, args.scenarios, args.repeat)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# Synthetic history served by the stand-ins.
+HISTORY_START = '1970-01-01'
+
+# Observation frequencies cycled through by the fake FRED series (daily, weekly, monthly, quarterly).
+FRED_FREQUENCIES = ('B', 'W-FRI', 'MS', 'QS')
+
+
+def _seed(name: str) -> int:
+    return zlib.crc32(name.encode())
+
+
+def random_walk(name: str, length: int, start: float = 100.0, volatility: float = 0.01) -> np.ndarray:
+    """
+    Returns a deterministic, strictly positive geometric random walk for `name`.
+    """
+    steps = np.random.default_rng(_seed(name)).normal(0, volatility, length)
+    return start * np.exp(np.cumsum(steps))
+
+
+class _CandleHandler(BaseHTTPRequestHandler):
+    server_version = "StubCandles/1.0"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        instrument = query.get('instrument', [''])[0]
+        granularity = query.get('granularity', ['D'])[0]
+        from_unix = int(query.get('from', ['0'])[0])
+        count = int(query.get('count', ['5000'])[0])
+
+        body = json.dumps(self.server.candles(instrument, from_unix, count, granularity)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubCandleServer(ThreadingHTTPServer):
+    """
+    Local HTTP stand-in for the fxempire candles endpoint.
+
+    Serves business-day candles for any instrument, in the JSON shape `CandleDownloader.fetch_page`
+    parses: a list of {'Date', 'Open', 'High', 'Low', 'Close'} objects, at most `count` of them
+    starting at `from`. Every instrument follows its own deterministic random walk, so overlapping
+    windows always agree. Intraday granularities are served on weekdays around that walk, with a
+    deterministic time-of-day pattern.
+
+    Usage:
+        with StubCandleServer() as server:
+            tracker.downloader.base_url = server.url
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), _CandleHandler)
+        self._days = (pd.bdate_range(HISTORY_START, pd.Timestamp.today().normalize())
+                      .values.astype('datetime64[s]').astype(np.int64))
+        self._prices = {}
+        self._prices_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/candles"
+
+    def _walk(self, instrument: str) -> np.ndarray:
+        with self._prices_lock:
+            if instrument not in self._prices:
+                self._prices[instrument] = random_walk(instrument, len(self._days))
+            return self._prices[instrument]
+
+    def _intraday(self, instrument: str, from_unix: int, count: int, step: int) -> list:
+        first = -(-from_unix // step) * step
+        ts = first + step * np.arange(count * 7 // 5 + 2 * 86_400 // step + 1, dtype=np.int64)
+        ts = ts[(((ts // 86_400) + 3) % 7 < 5) & (ts <= pd.Timestamp.now().timestamp())][:count]
+        if len(ts) == 0:
+            return []
+        walk = self._walk(instrument)
+        day = np.clip(np.searchsorted(self._days, ts // 86_400 * 86_400, side='right') - 1, 0, len(walk) - 1)
+        noise = np.modf(np.abs(np.sin(ts * 12.9898 + _seed(instrument))) * 43758.5453)[0] - 0.5
+        close = walk[day] * (1 + 0.003 * np.sin(2 * np.pi * (ts % 86_400) / 86_400) + 0.001 * noise)
+        opens = close * (1 - 0.0005 * noise)
+        dates = ts.astype('datetime64[s]').astype(str)
+        return [{'Date': f"{date}.000Z", 'Open': round(o, 4), 'High': round(max(o, c) * 1.0005, 4),
+                 'Low': round(min(o, c) * 0.9995, 4), 'Close': round(c, 4)}
+                for date, o, c in zip(dates, opens.tolist(), close.tolist())]
+
+    def candles(self, instrument: str, from_unix: int, count: int, granularity: str = 'D') -> list:
+        if granularity != 'D':
+            from candle_downloader import GRANULARITY_SECONDS
+
+            return self._intraday(instrument, from_unix, count, GRANULARITY_SECONDS[granularity])
+        close = self._walk(instrument)
+
+        lo = int(np.searchsorted(self._days, from_unix, side='left'))
+        hi = min(lo + count, len(self._days))
+        dates = self._days[lo:hi].astype('datetime64[s]').astype(str)
+        closes = close[lo:hi]
+        opens = close[lo - 1:hi - 1] if lo > 0 else np.concatenate([closes[:1], close[lo:hi - 1]])
+        return [{'Date': f"{date}.000Z", 'Open': round(o, 4), 'High': round(max(o, c) * 1.002, 4),
+                 'Low': round(min(o, c) * 0.998, 4), 'Close': round(c, 4)}
+                for date, o, c in zip(dates, opens.tolist(), closes.tolist())]
+
+    def start(self) -> 'StubCandleServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'StubCandleServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeFred:
+    """
+    Offline stand-in for `fredapi.Fred`, installed with `data_fetcher.set_fred_client`.
+
+    Every series ID gets a deterministic random walk at one of `FRED_FREQUENCIES`, chosen from
+    the ID, so a batch of indicators mixes daily, weekly, monthly and quarterly releases like
+    the real catalogue does.
+    """
+
+    def __init__(self, missing_ratio: float = 0.0):
+        self.missing_ratio = missing_ratio
+        self.requests = 0
+        # Generating the calendars is slow in pandas; build each once so the stand-in stays cheap.
+        self._calendars = {frequency: pd.date_range(HISTORY_START, pd.Timestamp.today().normalize(), freq=frequency)
+                           for frequency in FRED_FREQUENCIES}
+
+    def get_series(self, series_id: str, observation_start=None, observation_end=None, **kwargs) -> pd.Series:
+        self.requests += 1
+        dates = self._calendars[FRED_FREQUENCIES[_seed(series_id) % len(FRED_FREQUENCIES)]]
+        values = random_walk(series_id, len(dates), volatility=0.02)
+
+        if self.missing_ratio:
+            rng = np.random.default_rng(_seed(series_id) + 1)
+            values[rng.random(len(values)) < self.missing_ratio] = np.nan
+
+        series = pd.Series(values, index=dates)
+        return series.loc[observation_start:observation_end]
@@ -1 +1,25 @@
 FRED_API_KEY = 'YOUR_API_KEY'
+
+# Local SQLite price store used by CommodityInvestmentTracker. Set to None to always fetch from the API.
+PRICE_STORE_PATH = 'cit_prices.sqlite'
+# Seconds after which stored candles are considered stale and a delta fetch is made.
+PRICE_REFRESH_INTERVAL = 60 * 60
+
+# Local SQLite cache of FRED series. Set to None to always download.
+FRED_CACHE_PATH = 'cit_fred_cache.sqlite'
+# Number of FRED series downloaded in parallel.
+FRED_MAX_WORKERS = 8
+
+# In-process memoization of analysis results: bounds of the LRU.
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Optional SQLite file persisting memoized results across runs. None keeps them in memory only.
+RESULT_CACHE_PATH = None
+# Seconds a memoized indicator comparison stays valid; FRED series are released at most daily.
+INDICATOR_RESULT_TTL = 24 * 60 * 60
+# Typical days between a FRED observation's date and its release, for publication-lag aware alignment.
+PUBLICATION_LAGS = {'CPIAUCSL': 45, 'PCEPI': 60, 'UNRATE': 35, 'PAYEMS': 35, 'INDPRO': 45, 'GDP': 120, 'ICSA': 5}
+
+# Address of the local analytics service started with `CIT.py --serve`.
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8000
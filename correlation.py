@@ -0,0 +1,251 @@
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from alignment import asof, indicator_lag, observations
+
+# Minimum number of paired observations for a correlation to be reported.
+MIN_PERIODS = 3
+
+# Dates x indicators re-ranked at once by `spearman_matrix`, bounding its temporary arrays.
+_BLOCK_CELLS = 1 << 21
+
+
+def _datetime_index(index: pd.Index) -> pd.DatetimeIndex:
+    if isinstance(index, pd.DatetimeIndex):
+        return index
+    return pd.DatetimeIndex(pd.to_datetime(index, format='%d-%m-%Y'))
+
+
+@instrumentation.timed('correlation.indicator_panel')
+def build_indicator_panel(calendar: pd.Index, indicator_frames: Dict[str, pd.DataFrame],
+                          lags: Union[None, int, Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    Puts many indicators of any frequency onto one trading calendar.
+
+    Every calendar date takes the last indicator observation on or before it (as-of alignment),
+    found with one `searchsorted` per indicator (see `alignment`); dates before the first
+    observation stay NaN.
+
+    Args:
+    - calendar (pd.Index): The commodity's dates.
+    - indicator_frames (dict): Series ID -> DataFrame with a date column and a 'value' column,
+      as returned by `data_fetcher.get_economic_data`.
+    - lags (int or dict): Publication lag in days, for all indicators or per series ID.
+
+    Returns:
+    - pd.DataFrame: Indexed by `calendar`, one float64 column per indicator.
+    """
+    calendar = _datetime_index(calendar)
+    target = calendar.values.astype('datetime64[ns]')
+    panel = np.full((len(calendar), len(indicator_frames)), np.nan)
+
+    for j, (series_id, economic_data) in enumerate(indicator_frames.items()):
+        dates, values = observations(economic_data, indicator_lag(lags, series_id))
+        panel[:, j] = asof(dates, values, target)
+
+    return pd.DataFrame(panel, index=calendar, columns=list(indicator_frames.keys()))
+
+
+def _row_runs(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sorts every row of a 2-D array with one series per row (NaNs last) and finds its runs of ties.
+
+    Returns the row-wise argsort and two boolean matrices flagging the first and the last sorted
+    position of every run.
+    """
+    # Sorting is much faster without NaNs; they sort last either way.
+    order = np.argsort(np.where(np.isnan(values), np.inf, values), axis=1)
+    ordered = np.take_along_axis(values, order, axis=1)
+
+    run_start = np.ones(ordered.shape, dtype=bool)
+    run_start[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    run_end = np.ones(ordered.shape, dtype=bool)
+    run_end[:, :-1] = run_start[:, 1:]
+    return order, run_start, run_end
+
+
+def _average_ranks(values: np.ndarray, mask: Optional[np.ndarray] = None,
+                   runs: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    Row-wise ranks (1-based, ties get their average rank) of a 2-D array with one series per row,
+    among the positions selected by `mask` (default: the non-NaN ones); the others are NaN.
+
+    `runs` is the `_row_runs` of `values`, so ranking under several masks sorts only once.
+    """
+    order, run_start, run_end = _row_runs(values) if runs is None else runs
+    if mask is None:
+        # NaNs sort last, so the selected positions are simply 1, 2, ... in sorted order.
+        mask = ~np.isnan(values)
+        starts = ends = np.arange(1, values.shape[1] + 1, dtype=np.float64)
+    else:
+        # Counting the selected positions in sorted order, a tie run holds starts[first] .. ends[last].
+        selected = np.take_along_axis(mask, order, axis=1)
+        ends = np.cumsum(selected, axis=1, dtype=np.int32)
+        starts = ends - selected + 1
+    first = np.maximum.accumulate(np.where(run_start, starts, 0), axis=1)
+    last = np.minimum.accumulate(np.where(run_end, ends, values.shape[1] + 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2, axis=1)
+    ranks[~mask] = np.nan
+    return ranks
+
+
+def _subset_ranks(selected: np.ndarray, run_starts: np.ndarray) -> np.ndarray:
+    """
+    Average ranks of a sorted x within the positions selected by every row of a boolean matrix,
+    given the positions where the tie runs of x start.
+
+    The ranks come from cumulative counts along the sorted x, so no row needs its own sort;
+    values at unselected positions are meaningless.
+    """
+    if len(run_starts) == selected.shape[1]:
+        return np.cumsum(selected, axis=1, dtype=np.float64)
+    counts = np.add.reduceat(selected, run_starts, axis=1, dtype=np.int64)
+    run_ids = np.repeat(np.arange(len(run_starts)), np.diff(np.r_[run_starts, selected.shape[1]]))
+    return (np.cumsum(counts, axis=1) - (counts - 1) / 2)[:, run_ids]
+
+
+def _rank_correlation(x_ranks: np.ndarray, y_ranks: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Row-wise Pearson correlation of two rank matrices over the positions selected by `mask`,
+    where both are ranked among exactly those positions.
+    """
+    mean = (mask.sum(axis=1, keepdims=True) + 1) / 2
+    x = np.where(mask, x_ranks - mean, 0.0)
+    y = np.where(mask, y_ranks - mean, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.einsum('ij,ij->i', x, y) / np.sqrt(np.einsum('ij,ij->i', x, x) * np.einsum('ij,ij->i', y, y))
+
+
+def spearman_pvalues(correlations: pd.DataFrame, n_obs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Two-sided p-values of Spearman coefficients using the t approximation scipy also uses.
+    """
+    from scipy.stats import t as student_t
+
+    dof = n_obs.to_numpy(dtype=np.float64) - 2
+    r = correlations.to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_stat = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+    return pd.DataFrame(2 * student_t.sf(np.abs(t_stat), dof), index=correlations.index, columns=correlations.columns)
+
+
+@instrumentation.timed('correlation.spearman')
+def spearman_matrix(commodities: Union[pd.Series, pd.DataFrame], panel: pd.DataFrame, pvalues: bool = False,
+                    min_periods: int = MIN_PERIODS) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Spearman correlation of every commodity column against every indicator column.
+
+    NaNs are handled pairwise: each coefficient uses the dates where both series are present.
+    Every indicator column is ranked once. The commodity is sorted once and re-ranked within each
+    indicator's dates by cumulative counts over its sorted order, for blocks of columns at a time,
+    so indicators with different first observations (the usual result of as-of alignment) cost
+    no more than ones sharing them.
+
+    Args:
+    - commodities (pd.Series or pd.DataFrame): Commodity prices, one column per commodity.
+    - panel (pd.DataFrame): Indicator panel on the same index, see `build_indicator_panel`.
+    - pvalues (bool): Whether to also return two-sided p-values.
+    - min_periods (int): Minimum number of paired observations, fewer gives NaN.
+
+    Returns:
+    - pd.DataFrame: Indicators x commodities correlation matrix, plus the p-value matrix if requested.
+    """
+    if isinstance(commodities, pd.Series):
+        commodities = commodities.to_frame()
+
+    # Indicators x dates, so every indicator's values are contiguous.
+    values = np.ascontiguousarray(panel.to_numpy(dtype=np.float64).T)
+    valid = ~np.isnan(values)
+    runs = _row_runs(values)
+    panel_ranks = _average_ranks(values, runs=runs)
+    correlations = np.full((panel.shape[1], commodities.shape[1]), np.nan)
+    n_obs = np.zeros_like(correlations)
+    block = max(1, _BLOCK_CELLS // max(len(panel), 1))
+
+    for c, column in enumerate(commodities.columns):
+        x = commodities[column].to_numpy(dtype=np.float64)
+        if len(x) == 0:
+            continue
+        x_valid = ~np.isnan(x)
+        mask = valid & x_valid
+        if x_valid.all():
+            y_ranks = panel_ranks
+        else:
+            # The indicators lose the commodity's missing dates too and are ranked again without them.
+            y_ranks = _average_ranks(values, mask, runs)
+
+        order = np.argsort(np.where(x_valid, x, np.inf), kind='stable')
+        ordered = x[order]
+        run_starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+
+        # Everything is compared in the commodity's sorted order, where its ranks are running counts.
+        for lo in range(0, panel.shape[1], block):
+            selected = mask[lo:lo + block, order]
+            correlations[lo:lo + block, c] = _rank_correlation(_subset_ranks(selected, run_starts),
+                                                               y_ranks[lo:lo + block, order], selected)
+        n_obs[:, c] = mask.sum(axis=1)
+        correlations[n_obs[:, c] < min_periods, c] = np.nan
+
+    result = pd.DataFrame(correlations, index=panel.columns, columns=commodities.columns)
+    if not pvalues:
+        return result
+    return result, spearman_pvalues(result, pd.DataFrame(n_obs, index=panel.columns, columns=commodities.columns))
+
+
+def rolling_spearman(commodity: pd.Series, panel: pd.DataFrame, window: int = 252, step: int = 21,
+                     min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    Spearman correlation of one commodity against every indicator over a rolling window.
+
+    Returns:
+    - pd.DataFrame: Indexed by the last date of each window, one column per indicator.
+    """
+    ends = range(window, len(panel) + 1, step)
+    rows = [spearman_matrix(commodity.iloc[end - window:end], panel.iloc[end - window:end],
+                            min_periods=min_periods).iloc[:, 0] for end in ends]
+    return pd.DataFrame(rows, index=panel.index[[end - 1 for end in ends]], columns=panel.columns)
+
+
+def lead_lag_spearman(commodity: pd.Series, panel: pd.DataFrame, lags: Iterable[int],
+                      min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    Spearman correlation of one commodity against every indicator shifted by each lag.
+
+    A positive lag compares the commodity with the indicator value `lag` trading days earlier,
+    i.e. it measures how well the indicator leads the commodity.
+
+    Returns:
+    - pd.DataFrame: Indicators x lags correlation grid.
+    """
+    lags = list(lags)
+    columns = [spearman_matrix(commodity, panel.shift(lag), min_periods=min_periods).iloc[:, 0] for lag in lags]
+    return pd.DataFrame(dict(zip(lags, columns)), index=panel.columns).rename_axis(columns='lag')
+
+
+def correlate_indicators(commodity_data: pd.DataFrame, indicator_frames: Dict[str, pd.DataFrame],
+                         pvalues: bool = False, lags: Optional[Iterable[int]] = None,
+                         publication_lags: Union[None, int, Dict[str, int]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Builds the aligned panel and computes the Spearman matrix (and optionally p-values and a
+    lead/lag grid per commodity) for all indicators against all commodity columns at once.
+    """
+    commodities = commodity_data.copy()
+    commodities.index = _datetime_index(commodities.index)
+    commodities = commodities.apply(pd.to_numeric, errors='coerce')
+    panel = build_indicator_panel(commodities.index, indicator_frames, publication_lags)
+
+    result = {'panel': panel}
+    if pvalues:
+        result['correlation'], result['pvalues'] = spearman_matrix(commodities, panel, pvalues=True)
+    else:
+        result['correlation'] = spearman_matrix(commodities, panel)
+    if lags is not None:
+        lags = list(lags)
+        for column in commodities.columns:
+            result[f'lead_lag_{column}'] = lead_lag_spearman(commodities[column], panel, lags)
+    return result
@@ -1,11 +1,78 @@
-from fredapi import Fred
-from config import FRED_API_KEY
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import instrumentation
+from config import FRED_API_KEY, FRED_CACHE_PATH, FRED_MAX_WORKERS
 import pandas as pd
-import seaborn as sns
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import spearmanr
-def get_economic_data(series_id, start_date='2000-01-01', end_date='2023-12-31'):
+
+_fred_client = None
+_series_cache = None
+_client_lock = threading.Lock()
+
+
+def get_fred_client():
+    """
+    Returns the process-wide FRED client, creating it on first use.
+    """
+    global _fred_client
+    with _client_lock:
+        if _fred_client is None:
+            from fredapi import Fred
+
+            _fred_client = Fred(api_key=FRED_API_KEY)
+        return _fred_client
+
+
+def set_fred_client(client):
+    """
+    Replaces the process-wide FRED client, e.g. with an offline stand-in exposing `get_series`.
+    """
+    global _fred_client
+    with _client_lock:
+        _fred_client = client
+
+
+def get_series_cache():
+    """
+    Returns the process-wide FRED series cache, or None when caching is disabled in config.
+    """
+    global _series_cache
+    with _client_lock:
+        if _series_cache is None and FRED_CACHE_PATH:
+            from series_cache import SeriesCache
+
+            _series_cache = SeriesCache(FRED_CACHE_PATH)
+        return _series_cache
+
+
+def _fetch_series(series_id, start_date, end_date, use_cache=True):
+    cache = get_series_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(series_id, start_date, end_date)
+        if cached is not None:
+            instrumentation.count('fred.cache_hits')
+            return cached
+        instrumentation.count('fred.cache_misses')
+
+        # Widen the download to everything already cached so the entry keeps growing.
+        coverage = cache.coverage(series_id)
+        if coverage is not None:
+            from series_cache import iso_date
+
+            start_date, end_date = min(iso_date(start_date), coverage[0]), max(iso_date(end_date), coverage[1])
+
+    with instrumentation.span('fred.download', series_id=series_id):
+        data = get_fred_client().get_series(series_id, observation_start=start_date, observation_end=end_date)
+    df = pd.DataFrame(data, columns=['value']).reset_index().rename(columns={'index': 'Date'})
+    instrumentation.count('fred.downloads')
+    instrumentation.count('rows.fred_observations', len(df))
+
+    if cache is not None:
+        cache.put(series_id, df, start_date, end_date)
+    return df
+
+
+def get_economic_data(series_id, start_date='2000-01-01', end_date='2023-12-31', use_cache=True):
     """
     Fetches economic data for a given FRED series ID.
     
@@ -13,40 +80,76 @@ def get_economic_data(series_id, start_date='2000-01-01', end_date='2023-12-31')
     - series_id (str): The FRED series ID (e.g., 'GDP', 'CPIAUCSL').
     - start_date (str): The start date for fetching data.
     - end_date (str): The end date for fetching data.
+    - use_cache (bool): Whether to serve and store the series through the local series cache.
     
     Returns:
     - pd.DataFrame: A DataFrame containing the date and corresponding values.
     """
-    fred = Fred(api_key=FRED_API_KEY)
     try:
-        data = fred.get_series(series_id, observation_start=start_date, observation_end=end_date)
-        return pd.DataFrame(data, columns=['value']).reset_index().rename(columns={'index': 'Date'})
+        df = _fetch_series(series_id, start_date, end_date, use_cache)
+        return df[(df['Date'] >= start_date) & (df['Date'] <= end_date)].reset_index(drop=True)
     except ValueError as e:
         print(f"Error fetching data for series ID {series_id}: {e}")
         return None
 
-def calculate_monotonic_relationships(commodity_data, economic_series_ids):
-    """
-    Calculate the monotonic relationships between a commodity and multiple economic indicators.
-    ...
+
+@instrumentation.timed('fred.fetch_batch')
+def fetch_economic_data(series_ids, start_date='2000-01-01', end_date='2023-12-31', max_workers=FRED_MAX_WORKERS,
+                        use_cache=True):
     """
-    correlation_results = {}
+    Fetches several FRED series concurrently.
+
+    Args:
+    - series_ids (list): The FRED series IDs to fetch.
+    - start_date (str): The start date for fetching data.
+    - end_date (str): The end date for fetching data.
+    - max_workers (int): Maximum number of concurrent downloads.
+    - use_cache (bool): Whether to serve and store the series through the local series cache.
 
-    for series_id in economic_series_ids:
-        economic_data = get_economic_data(series_id, start_date='2000-01-01')
+    Returns:
+    - tuple: A dict of series ID -> DataFrame for the series that could be fetched and a dict of
+      series ID -> error message for those that failed.
+    """
+    def fetch(series_id):
+        try:
+            df = _fetch_series(series_id, start_date, end_date, use_cache)
+            return series_id, df[(df['Date'] >= start_date) & (df['Date'] <= end_date)].reset_index(drop=True), None
+        except Exception as e:
+            return series_id, None, f"{type(e).__name__}: {e}"
 
-        if economic_data is None:
-            continue  
+    series_ids = list(dict.fromkeys(series_ids))
+    results, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(series_ids) or 1))) as executor:
+        for series_id, df, error in executor.map(fetch, series_ids):
+            if error is None:
+                results[series_id] = df
+            else:
+                failures[series_id] = error
 
-        date_col = economic_data.columns[economic_data.columns.str.lower() == 'date'][0]
-        economic_data[date_col] = pd.to_datetime(economic_data[date_col])
+    if failures:
+        logging.warning(f"Failed to fetch {len(failures)} of {len(series_ids)} FRED series: "
+                        + ", ".join(f"{sid} ({err})" for sid, err in failures.items()))
+    return results, failures
 
-        merged_data = commodity_data.merge(economic_data, left_index=True, right_on=date_col, how='inner', suffixes=('_commodity', '_economic'))
+def calculate_monotonic_relationships(commodity_data, economic_series_ids, max_workers=FRED_MAX_WORKERS, use_cache=True):
+    """
+    Calculate the monotonic relationships between a commodity and multiple economic indicators.
+    ...
+    All indicators are aligned onto the commodity's dates (as-of, so monthly and quarterly
+    series carry their last release forward) and correlated in one batched Spearman pass.
+    Series that cannot be fetched are skipped and reported in a warning; thanks to the series
+    cache a rerun only downloads those.
+    """
+    from correlation import correlate_indicators
+    from price_series import as_price_series
 
-        correlation, _ = spearmanr(merged_data.iloc[:, 0], merged_data['value'])
-        correlation_results[series_id] = correlation
+    economic_frames, _ = fetch_economic_data(economic_series_ids, start_date='2000-01-01', max_workers=max_workers,
+                                             use_cache=use_cache)
 
-    correlation_series = pd.Series(correlation_results)
+    # A PriceSeries or a price frame; only its first price column is correlated.
+    commodity = as_price_series(commodity_data).to_frame()
+    correlation_series = correlate_indicators(commodity, economic_frames)['correlation'].iloc[:, 0]
+    correlation_series = correlation_series.dropna()
 
     top_increasing = correlation_series.nlargest(10)
     top_decreasing = correlation_series.nsmallest(10)
@@ -54,41 +157,6 @@ def calculate_monotonic_relationships(commodity_data, economic_series_ids):
     return top_increasing, top_decreasing
 
 def visualize_relationships(top_increasing, top_decreasing):
-    sns.set_style("whitegrid")
-    
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 10))
-    
-    def add_value_labels(ax, spacing=0.01):
-        for rect in ax.patches:
-            value = rect.get_width()
-            text = f'{value:.2f}'
-            y = rect.get_y() + rect.get_height() / 2
-            x = rect.get_width()
-            ha = 'left' if value >= 0 else 'right'
-            ax.text(x + np.sign(x) * spacing, y, text, ha=ha, va='center')
-
-    sns.barplot(x=top_increasing.values, y=top_increasing.index, ax=ax1, palette='YlOrRd')
-    ax1.set_title('Top 10 Increasing Relationships', fontsize=16, fontweight='bold')
-    ax1.set_xlabel('Spearman Correlation Coefficient', fontsize=12)
-    ax1.set_ylabel('')
-    ax1.axvline(0, color='grey', lw=1, linestyle='--')
-    add_value_labels(ax1)
-
-    sns.barplot(x=top_decreasing.values, y=top_decreasing.index, ax=ax2, palette='YlGnBu_r')
-    ax2.set_title('Top 10 Decreasing Relationships', fontsize=16, fontweight='bold')
-    ax2.set_xlabel('Spearman Correlation Coefficient', fontsize=12)
-    ax2.set_ylabel('')
-    ax2.axvline(0, color='grey', lw=1, linestyle='--')
-    add_value_labels(ax2)
-
-    plt.tight_layout()
-    fig.suptitle('Top Increasing and Decreasing Relationships', fontsize=20, fontweight='bold', y=1.05)
-
-    sm1 = plt.cm.ScalarMappable(cmap='YlOrRd', norm=plt.Normalize(vmin=0, vmax=1))
-    sm2 = plt.cm.ScalarMappable(cmap='YlGnBu_r', norm=plt.Normalize(vmin=-1, vmax=0))
-    cbar1 = fig.colorbar(sm1, ax=ax1, orientation='horizontal', pad=0.08, aspect=30)
-    cbar2 = fig.colorbar(sm2, ax=ax2, orientation='horizontal', pad=0.08, aspect=30)
-    cbar1.set_label('Strength of Positive Correlation', fontsize=10)
-    cbar2.set_label('Strength of Negative Correlation', fontsize=10)
-
-    plt.show()
+    from rendering import plot_relationships
+
+    plot_relationships(top_increasing, top_decreasing)
@@ -0,0 +1,254 @@
+"""
+Export of price series, analysis outputs and correlation tables to files.
+
+CSV and JSON Lines need nothing beyond pandas; Parquet and Arrow need pyarrow and Excel needs
+openpyxl, both imported only when used. Every writer streams its input in chunks of
+`CHUNK_ROWS` rows, so an iterable of frames larger than memory can be written, and supports
+append mode for incremental data.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from price_series import DATE_FORMAT, PriceSeries
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet', 'arrow', 'xlsx')
+
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet', '.pq': 'parquet',
+               '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow', '.xlsx': 'xlsx'}
+
+# Rows written per chunk.
+CHUNK_ROWS = 100_000
+
+# Parquet compression codec.
+PARQUET_COMPRESSION = 'zstd'
+
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Returns the export format given explicitly or implied by the file extension.
+    """
+    if fmt is None:
+        fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise ValueError(f"Cannot infer the export format of {path}. Use one of {', '.join(EXPORT_FORMATS)}.")
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}. Use one of {', '.join(EXPORT_FORMATS)}.")
+    return fmt
+
+
+def to_table(data: Union[pd.DataFrame, pd.Series, PriceSeries]) -> pd.DataFrame:
+    """
+    Returns `data` as a flat frame: a meaningful index (dates, series IDs) becomes the first column.
+    """
+    if isinstance(data, PriceSeries):
+        data = data.to_frame()
+    elif isinstance(data, pd.Series):
+        data = data.to_frame(data.name if data.name is not None else 'value')
+    if isinstance(data.index, pd.RangeIndex) and data.index.name is None:
+        return data
+    if data.index.name is None and not isinstance(data.index, pd.MultiIndex):
+        data = data.rename_axis('Date' if isinstance(data.index, pd.DatetimeIndex) else 'index')
+    return data.reset_index()
+
+
+def _chunks(data, chunk_rows: int) -> Iterable[pd.DataFrame]:
+    """
+    Yields `data` (a frame-like object or an iterable of them) as flat frames of at most `chunk_rows` rows.
+    """
+    if isinstance(data, (pd.DataFrame, pd.Series, PriceSeries)):
+        data = [data]
+    first_empty, rows = None, 0
+    for part in data:
+        table = to_table(part)
+        if len(table) == 0 and first_empty is None:
+            first_empty = table
+        for start in range(0, len(table), chunk_rows):
+            yield table.iloc[start:start + chunk_rows]
+        rows += len(table)
+    # Without any rows the first empty table still gives the writers their columns.
+    if rows == 0 and first_empty is not None:
+        yield first_empty
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow export need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _next_part(directory: str, extension: str) -> str:
+    """
+    Returns the path of the next `part-NNNNN` file of a dataset directory, creating the directory.
+
+    A single file at `directory`, e.g. from an earlier export without append, becomes its first part.
+    """
+    if os.path.isfile(directory):
+        moved = f"{directory}.part-00000.tmp"
+        os.replace(directory, moved)
+        os.makedirs(directory)
+        os.replace(moved, os.path.join(directory, f"part-00000{extension}"))
+    os.makedirs(directory, exist_ok=True)
+    existing = [name for name in os.listdir(directory) if name.startswith('part-') and name.endswith(extension)]
+    return os.path.join(directory, f"part-{len(existing):05d}{extension}")
+
+
+def _write_csv(chunks, path: str, append: bool) -> int:
+    header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+    rows = 0
+    with open(path, 'a' if append else 'w', newline='') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+            rows += len(chunk)
+    return rows
+
+
+def _write_jsonl(chunks, path: str, append: bool) -> int:
+    rows = 0
+    with open(path, 'a' if append else 'w') as f:
+        for chunk in chunks:
+            if len(chunk):
+                f.write(chunk.to_json(orient='records', lines=True, date_format='iso', date_unit='s'))
+                f.write('\n')
+            rows += len(chunk)
+    return rows
+
+
+def _write_arrow_file(chunks, path: str, fmt: str, compression: str) -> int:
+    pa = _require_pyarrow()
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == 'parquet':
+                    import pyarrow.parquet as pq
+
+                    writer = pq.ParquetWriter(path, table.schema, compression=compression)
+                else:
+                    writer = pa.ipc.new_file(path, table.schema,
+                                             options=pa.ipc.IpcWriteOptions(compression=compression))
+            writer.write_table(table) if fmt == 'parquet' else writer.write(table)
+            rows += len(chunk)
+        if writer is None:
+            # No input at all: still leave a readable file, an empty table without columns.
+            table = pa.table({})
+            if fmt == 'parquet':
+                import pyarrow.parquet as pq
+
+                pq.write_table(table, path, compression=compression)
+            else:
+                with pa.ipc.new_file(path, table.schema) as empty_writer:
+                    empty_writer.write(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _write_xlsx(chunks, path: str, append: bool) -> int:
+    if append:
+        raise ValueError("Append mode is not supported for Excel; use csv, jsonl, parquet or arrow.")
+    frame = pd.concat(list(chunks), ignore_index=True)
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime(DATE_FORMAT)
+    frame.to_excel(path, index=False)
+    return len(frame)
+
+
+def export(data, path: str, fmt: Optional[str] = None, append: bool = False, chunk_rows: int = CHUNK_ROWS,
+           compression: Optional[str] = None) -> int:
+    """
+    Writes a price series, frame or an iterable of frames to `path`.
+
+    Args:
+    - data (PriceSeries, pd.DataFrame, pd.Series or iterable of them): What to write. An iterable
+      (e.g. a generator of chunks) is consumed one item at a time, so it can exceed memory.
+    - path (str): Output file. In append mode Parquet and Arrow write a new `part-NNNNN` file
+      into `path` as a dataset directory, which `pd.read_parquet(path)` reads back as one table;
+      a file already written to `path` without append becomes its first part.
+    - fmt (str): One of `EXPORT_FORMATS`; inferred from the extension if None.
+    - append (bool): Add to an existing export instead of replacing it.
+    - chunk_rows (int): Rows written per chunk.
+    - compression (str): Parquet/Arrow codec, defaults to zstd for Parquet and lz4 for Arrow.
+
+    Returns:
+    - int: The number of rows written.
+    """
+    fmt = export_format(path, fmt)
+    chunks = _chunks(data, chunk_rows)
+
+    with instrumentation.span(f'export.{fmt}'):
+        if fmt == 'csv':
+            rows = _write_csv(chunks, path, append)
+        elif fmt == 'jsonl':
+            rows = _write_jsonl(chunks, path, append)
+        elif fmt in ('parquet', 'arrow'):
+            compression = compression or (PARQUET_COMPRESSION if fmt == 'parquet' else 'lz4')
+            if append:
+                path = _next_part(path, '.parquet' if fmt == 'parquet' else '.arrow')
+            rows = _write_arrow_file(chunks, path, fmt, compression)
+        else:
+            rows = _write_xlsx(chunks, path, append)
+    instrumentation.count('rows.exported', rows)
+    return rows
+
+
+def to_jsonable(value):
+    """
+    Converts analysis outputs (timestamps, numpy scalars, Series, DataFrames, nested dicts and
+    lists) to JSON types. Timestamps at midnight become 'YYYY-MM-DD', others ISO 8601; NaN and
+    infinities become null.
+    """
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return {str(column): to_jsonable(value[column]) for column in value.columns}
+    if isinstance(value, pd.Series):
+        return {to_jsonable(key) if isinstance(key, pd.Timestamp) else str(key): to_jsonable(item)
+                for key, item in value.items()}
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d') if value == value.normalize() else value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def export_result(result: Dict[str, Any], directory: str, fmt: str = 'parquet', append: bool = False) -> Dict[str, str]:
+    """
+    Writes an analysis output (e.g. of `investment_analysis`, `instrument_comparison` or
+    `correlate_indicators`) into `directory`: every table as `<key>.<fmt>` and the scalar
+    metrics as `metrics.json`.
+
+    Returns:
+    - dict: Key -> path written.
+    """
+    fmt = export_format('', fmt)
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for key, value in result.items():
+        if isinstance(value, (pd.DataFrame, pd.Series, PriceSeries)):
+            path = os.path.join(directory, f"{key}.{fmt}")
+            export(value, path, fmt=fmt, append=append)
+            written[key] = path
+        elif key == 'metrics':
+            path = os.path.join(directory, 'metrics.json')
+            with open(path, 'w') as f:
+                json.dump(to_jsonable(value), f, indent=2)
+            written[key] = path
+    return written
@@ -0,0 +1,171 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_lock = threading.Lock()
+_enabled = False
+_listeners: List[Callable[[Dict[str, Any]], None]] = []
+_spans: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+
+
+def enable():
+    """
+    Starts aggregating spans and counters for `report`. Listeners are notified either way.
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_active() -> bool:
+    return _enabled or bool(_listeners)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def add_listener(callback: Callable[[Dict[str, Any]], None]):
+    """
+    Registers a callback that receives every finished span and counter increment as a dict:
+    {'type': 'span', 'name', 'duration', 'attrs'} or {'type': 'counter', 'name', 'value', 'attrs'}.
+
+    Callbacks run synchronously on the thread that produced the event and must be fast.
+    """
+    with _lock:
+        _listeners.append(callback)
+
+
+def remove_listener(callback: Callable[[Dict[str, Any]], None]):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def _emit(event: Dict[str, Any]):
+    for callback in list(_listeners):
+        callback(event)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Times the enclosed block as stage `name`. Costs a single flag check when nothing is listening.
+    """
+    if not is_active():
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        if _enabled:
+            with _lock:
+                stats = _spans.get(name)
+                if stats is None:
+                    _spans[name] = [1, duration, duration]
+                else:
+                    stats[0] += 1
+                    stats[1] += duration
+                    stats[2] = max(stats[2], duration)
+        if _listeners:
+            _emit({'type': 'span', 'name': name, 'duration': duration, 'attrs': attrs})
+
+
+def timed(name: str):
+    """
+    Decorator form of `span`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1, **attrs):
+    """
+    Adds `value` to counter `name`, e.g. bytes downloaded, cache hits or rows processed.
+    """
+    if not is_active():
+        return
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+    if _listeners:
+        _emit({'type': 'counter', 'name': name, 'value': value, 'attrs': attrs})
+
+
+def report() -> Dict[str, Any]:
+    """
+    Returns the aggregated stages (calls, total and max seconds) and counters recorded since the last `reset`.
+    """
+    with _lock:
+        spans = {name: {'calls': calls, 'total_s': total, 'max_s': longest}
+                 for name, (calls, total, longest) in _spans.items()}
+        counters = dict(_counters)
+    return {'spans': dict(sorted(spans.items(), key=lambda item: -item[1]['total_s'])), 'counters': counters}
+
+
+def format_report(data: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Formats `report()` as a plain-text stage breakdown.
+    """
+    data = report() if data is None else data
+    lines = [f"{'Stage':<32} {'Calls':>7} {'Total (ms)':>12} {'Mean (ms)':>11} {'Max (ms)':>10}"]
+    for name, stats in data['spans'].items():
+        lines.append(f"{name:<32} {stats['calls']:>7} {stats['total_s'] * 1000:>12.1f} "
+                     f"{stats['total_s'] / stats['calls'] * 1000:>11.2f} {stats['max_s'] * 1000:>10.1f}")
+    if data['counters']:
+        lines.append("")
+        lines.append(f"{'Counter':<32} {'Value':>12}")
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"{name:<32} {value:>12,.0f}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile_session(output: Optional[str] = None):
+    """
+    Records everything run inside the block and prints the stage breakdown at the end.
+
+    `output` optionally also writes the result: a path ending in '.json' gets the breakdown as
+    JSON, any other path (e.g. 'run.prof') a cProfile dump readable with `pstats` or snakeviz.
+    """
+    profiler = None
+    if output and not output.endswith('.json'):
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    reset()
+    enable()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        disable()
+        data = report()
+        print(format_report(data))
+        if profiler is not None:
+            profiler.dump_stats(output)
+        elif output:
+            with open(output, 'w') as f:
+                json.dump(data, f, indent=2)
@@ -0,0 +1,197 @@
+"""
+Streaming processing of intraday candles.
+
+Intraday history is orders of magnitude larger than daily closes, so everything here consumes
+candles as an iterable of chunks (e.g. `PriceStore.iter_load` or `CandleDownloader.iter_pages`)
+and only keeps the unfinished bar or day between chunks. Memory therefore depends on the chunk
+size, not on how much history is processed.
+
+- `OHLCResampler` / `resample_ohlc` aggregate candles to a coarser granularity, e.g. M1 to H1 to D.
+- `EntryTimingProfile` measures, per time of day, how buying at that time compared with buying
+  at the day's close, to analyze entry timing within the day.
+"""
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from candle_downloader import GRANULARITY_SECONDS
+
+_SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _arrays(chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the epoch seconds and the (n x 4) OHLC prices of a candle frame with a 'Date' column.
+    """
+    dates = chunk["Date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, utc=True).dt.tz_localize(None)
+    ts = dates.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    ohlc = chunk.reindex(columns=["Open", "High", "Low", "Close"]).apply(pd.to_numeric, errors="coerce")
+    return ts, ohlc.to_numpy(dtype=np.float64)
+
+
+def _frame(ts: np.ndarray, ohlc: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({"Date": ts.astype('datetime64[s]').astype('datetime64[ns]'), "Open": ohlc[:, 0],
+                         "High": ohlc[:, 1], "Low": ohlc[:, 2], "Close": ohlc[:, 3]})
+
+
+class OHLCResampler:
+    """
+    Aggregates date-ordered candles into bars of `granularity` (a key of `GRANULARITY_SECONDS`).
+
+    Each bar opens at the first candle's open, closes at the last candle's close and spans their
+    high and low; it is dated by the start of its period (UTC). Feed chunks with `push`, which
+    returns the bars completed so far, and call `flush` at the end for the last one.
+    """
+
+    def __init__(self, granularity: str):
+        if granularity not in GRANULARITY_SECONDS:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        self.granularity = granularity
+        self.step = GRANULARITY_SECONDS[granularity]
+        self._pending: Optional[Tuple[int, np.ndarray]] = None
+
+    def push(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds a chunk of candles (later than any pushed before) and returns the bars it completed.
+        """
+        ts, ohlc = _arrays(chunk)
+        if len(ts) == 0:
+            return _frame(ts, ohlc.reshape(0, 4))
+
+        buckets = ts // self.step * self.step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        bars = np.column_stack([ohlc[starts, 0], np.fmax.reduceat(ohlc[:, 1], starts),
+                                np.fmin.reduceat(ohlc[:, 2], starts), ohlc[ends, 3]])
+        bar_ts = buckets[starts]
+
+        if self._pending is not None:
+            pending_ts, pending = self._pending
+            if bar_ts[0] == pending_ts:
+                bars[0] = [pending[0], np.fmax(pending[1], bars[0, 1]), np.fmin(pending[2], bars[0, 2]), bars[0, 3]]
+            else:
+                bar_ts = np.r_[pending_ts, bar_ts]
+                bars = np.vstack([pending, bars])
+
+        self._pending = (int(bar_ts[-1]), bars[-1].copy())
+        return _frame(bar_ts[:-1], bars[:-1])
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Returns the last, possibly still forming, bar and resets the resampler.
+        """
+        if self._pending is None:
+            return _frame(np.empty(0, dtype=np.int64), np.empty((0, 4)))
+        pending_ts, pending = self._pending
+        self._pending = None
+        return _frame(np.array([pending_ts]), pending.reshape(1, 4))
+
+
+def resample_ohlc(chunks: Iterable[pd.DataFrame], granularity: str) -> Iterator[pd.DataFrame]:
+    """
+    Yields the bars of `granularity` built from an iterable of date-ordered candle chunks, chunk by chunk.
+    """
+    resampler = OHLCResampler(granularity)
+    for chunk in chunks:
+        with instrumentation.span('intraday.resample'):
+            bars = resampler.push(chunk)
+        if len(bars):
+            yield bars
+    bars = resampler.flush()
+    if len(bars):
+        yield bars
+
+
+def resample(candles: pd.DataFrame, granularity: str) -> pd.DataFrame:
+    """
+    Returns `candles` aggregated to `granularity`, see `OHLCResampler`.
+    """
+    bars = list(resample_ohlc([candles], granularity))
+    return pd.concat(bars, ignore_index=True) if bars else _frame(np.empty(0, dtype=np.int64), np.empty((0, 4)))
+
+
+class EntryTimingProfile:
+    """
+    Accumulates, per time-of-day slot (UTC), the return from buying at a candle's close to the
+    close of the same day, over chunks of date-ordered intraday candles.
+
+    Only the candles of the current, unfinished day are kept between chunks.
+
+    Args:
+    - slot_minutes (int): Width of the time-of-day slots.
+    """
+
+    def __init__(self, slot_minutes: int = 60):
+        self.slot_seconds = slot_minutes * 60
+        self.slots = _SECONDS_PER_DAY // self.slot_seconds
+        self._sum = np.zeros(self.slots)
+        self._sum_sq = np.zeros(self.slots)
+        self._count = np.zeros(self.slots)
+        self.days = 0
+        self._ts = np.empty(0, dtype=np.int64)
+        self._close = np.empty(0)
+
+    def _add_days(self, ts: np.ndarray, close: np.ndarray):
+        if len(ts) == 0:
+            return
+        day = ts // _SECONDS_PER_DAY
+        last = np.r_[np.flatnonzero(day[1:] != day[:-1]), len(ts) - 1]
+        day_close = np.repeat(close[last], np.diff(np.r_[-1, last]))
+        to_close = (day_close / close - 1) * 100
+        slot = (ts % _SECONDS_PER_DAY) // self.slot_seconds
+        valid = np.isfinite(to_close)
+        self._sum += np.bincount(slot[valid], weights=to_close[valid], minlength=self.slots)
+        self._sum_sq += np.bincount(slot[valid], weights=to_close[valid] ** 2, minlength=self.slots)
+        self._count += np.bincount(slot[valid], minlength=self.slots)
+        self.days += len(last)
+
+    def push(self, chunk: pd.DataFrame):
+        """
+        Adds a chunk of candles later than any pushed before.
+        """
+        ts, ohlc = _arrays(chunk)
+        ts, close = np.r_[self._ts, ts], np.r_[self._close, ohlc[:, 3]]
+        if len(ts) == 0:
+            return
+        # The last day may continue in the next chunk.
+        cut = int(np.searchsorted(ts, ts[-1] // _SECONDS_PER_DAY * _SECONDS_PER_DAY, side='left'))
+        self._add_days(ts[:cut], close[:cut])
+        self._ts, self._close = ts[cut:], close[cut:]
+
+    def flush(self):
+        """
+        Counts the candles of the last day too; call once all chunks are pushed.
+        """
+        self._add_days(self._ts, self._close)
+        self._ts, self._close = np.empty(0, dtype=np.int64), np.empty(0)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns one row per time-of-day slot with observations: 'mean_to_close' and 'std_to_close',
+        the mean and standard deviation of the return (%) from that slot to the day's close, and
+        'observations'. A negative mean means buying at that time was cheaper than at the close.
+        """
+        seen = self._count > 0
+        count = self._count[seen]
+        mean = self._sum[seen] / count
+        variance = np.maximum(self._sum_sq[seen] / count - mean ** 2, 0) * count / np.maximum(count - 1, 1)
+        starts = np.flatnonzero(seen) * self.slot_seconds
+        labels = [f"{s // 3600:02d}:{s % 3600 // 60:02d}" for s in starts]
+        return pd.DataFrame({'mean_to_close': mean, 'std_to_close': np.sqrt(variance), 'observations': count.astype(np.int64)},
+                            index=pd.Index(labels, name='Time'))
+
+
+def entry_timing(chunks: Iterable[pd.DataFrame], slot_minutes: int = 60) -> pd.DataFrame:
+    """
+    Returns the `EntryTimingProfile` of an iterable of date-ordered intraday candle chunks.
+    """
+    profile = EntryTimingProfile(slot_minutes)
+    for chunk in chunks:
+        with instrumentation.span('intraday.entry_timing'):
+            profile.push(chunk)
+    profile.flush()
+    return profile.result()
@@ -0,0 +1,84 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+SCHEDULE_ALIGNMENTS = ('next', 'previous', 'exact')
+
+
+def align_schedule(dates: np.ndarray, schedule: np.ndarray, alignment: str = 'next') -> np.ndarray:
+    """
+    Maps scheduled dates onto positions in a sorted array of trading dates.
+
+    Args:
+    - dates (np.ndarray): Sorted trading dates (datetime64).
+    - schedule (np.ndarray): Scheduled investment dates (datetime64).
+    - alignment (str): 'next' buys on the first trading day on or after the scheduled date,
+      'previous' buys at the last close on or before it and 'exact' only keeps scheduled
+      dates that are trading days.
+
+    Returns:
+    - np.ndarray: Positions into `dates` for every schedule entry that could be filled.
+    """
+    if alignment == 'next':
+        idx = np.searchsorted(dates, schedule, side='left')
+        return idx[idx < len(dates)]
+    if alignment == 'previous':
+        idx = np.searchsorted(dates, schedule, side='right') - 1
+        return idx[idx >= 0]
+    if alignment == 'exact':
+        idx = np.searchsorted(dates, schedule, side='left')
+        found = idx < len(dates)
+        found[found] = dates[idx[found]] == schedule[found]
+        return idx[found]
+    raise ValueError(f"Invalid alignment '{alignment}'. Please use one of {SCHEDULE_ALIGNMENTS}.")
+
+
+def periodic_investment_growth(dates: np.ndarray, prices: np.ndarray, start_date, end_date,
+                               interval_days: int, investment_amount: float,
+                               alignment: str = 'next') -> Dict[str, Any]:
+    """
+    Simulates investing a fixed amount every `interval_days` between two dates.
+
+    The whole schedule is mapped onto trading days in one pass and units, invested capital
+    and value are computed with cumulative sums instead of a per-date loop.
+
+    Args:
+    - dates (np.ndarray): Sorted trading dates (datetime64).
+    - prices (np.ndarray): Close prices matching `dates`.
+    - start_date, end_date: First and last day of the schedule (anything np.datetime64 accepts).
+    - interval_days (int): Days between two scheduled investments.
+    - investment_amount (float): Amount invested on every scheduled date.
+    - alignment (str): How non-trading schedule dates are filled, see `align_schedule`.
+
+    Returns:
+    - dict: 'Date', 'Value', 'Total_Invested' and 'Units' arrays (one entry per investment) and
+      the scalars 'units_bought', 'total_invested' and 'final_value'.
+    """
+    dates = np.asarray(dates).astype('datetime64[D]')
+    prices = np.asarray(prices, dtype=np.float64)
+    start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+    end = np.datetime64(pd.Timestamp(end_date).date(), 'D')
+
+    lo, hi = np.searchsorted(dates, [start, end + 1])
+    dates, prices = dates[lo:hi], prices[lo:hi]
+    if len(dates) == 0:
+        raise ValueError("No data available in the specified date range.")
+
+    schedule = np.arange(start, end + 1, np.timedelta64(interval_days, 'D'))
+    idx = align_schedule(dates, schedule, alignment)
+
+    buy_prices = prices[idx]
+    units = np.cumsum(investment_amount / buy_prices)
+    total_invested = investment_amount * np.arange(1, len(idx) + 1, dtype=np.float64)
+    units_bought = units[-1] if len(units) else 0.0
+
+    return {
+        'Date': dates[idx],
+        'Value': units * buy_prices,
+        'Total_Invested': total_invested,
+        'Units': units,
+        'units_bought': units_bought,
+        'total_invested': total_invested[-1] if len(total_invested) else 0.0,
+        'final_value': units_bought * prices[-1],
+    }
@@ -0,0 +1,226 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_PATH
+from price_series import PriceSeries
+
+_result_cache = None
+_cache_lock = threading.Lock()
+
+
+def _sizeof(value) -> int:
+    """
+    Approximate memory footprint of an analysis result, counting the data buffers only.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, (pd.Index, np.ndarray, PriceSeries)):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values()) + 64 * len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(v) for v in value) + 8 * len(value)
+    return 64
+
+
+class ResultCache:
+    """
+    Memoizes analysis results keyed by the content hash of the price window they read plus the
+    call parameters.
+
+    Entries live in an in-process LRU bounded by `max_entries` and `max_bytes`, and optionally in
+    an SQLite file (`path`) shared between processes and runs. Every entry remembers the series
+    and the date range it was computed from, so when new candles arrive `invalidate` drops just
+    the entries reaching into the changed dates. Because the key contains the content hash, an
+    entry can never be served for data it was not computed from; invalidation only frees space.
+
+    Cached results are shared, callers must not modify them.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (result, size, series name, first day, last day, expires at)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._bytes = 0
+
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    series TEXT NOT NULL,
+                    first_day INTEGER NOT NULL,
+                    last_day INTEGER NOT NULL,
+                    expires_at REAL,
+                    value BLOB NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_range ON results (series, last_day)")
+            self._conn.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[1]
+
+    def _get_memory(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[5] is not None and entry[5] <= time.time():
+                del self._entries[key]
+                self._bytes -= entry[1]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put_memory(self, key: tuple, result, series: str, first_day: int, last_day: int, expires_at: Optional[float]):
+        size = _sizeof(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size, series, first_day, last_day, expires_at)
+            self._bytes += size
+            self._evict()
+
+    def _get_disk(self, key: tuple):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT series, first_day, last_day, expires_at, value FROM results WHERE key = ?",
+                                     (repr(key),)).fetchone()
+        if row is None or (row[3] is not None and row[3] <= time.time()):
+            return None
+        return row
+
+    def _put_disk(self, key: tuple, result, series: str, first_day: int, last_day: int, expires_at: Optional[float]):
+        if self._conn is None:
+            return
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (key, series, first_day, last_day, expires_at, value) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (repr(key), series, first_day, last_day, expires_at, blob))
+            self._conn.commit()
+
+    def get_or_compute(self, kind: str, series: PriceSeries, start_date, end_date, params: Tuple,
+                       compute: Callable[[], Any], ttl: Optional[float] = None):
+        """
+        Returns the cached result of `compute()` for this price window and parameters, computing and storing it on a miss.
+
+        Args:
+        - kind (str): Name of the computation, e.g. 'investment'.
+        - series (PriceSeries): The prices the computation reads.
+        - start_date, end_date: The date range it reads (inclusive, None for open); only the
+          prices inside it are hashed.
+        - params (tuple): Every other argument that affects the result; must be hashable.
+        - compute (callable): Produces the result on a miss.
+        - ttl (float): Seconds the entry stays valid, e.g. when it also depends on external data.
+
+        A None result (nothing to report) is returned without being stored.
+        """
+        lo, hi = series.bounds(start_date, end_date)
+        key = (kind, series.name, series.digest(lo, hi), params)
+
+        entry = self._get_memory(key)
+        if entry is not None:
+            self.hits += 1
+            instrumentation.count('result_cache.hits')
+            return entry[0]
+
+        first_day = int(series.days[lo]) if hi > lo else 0
+        last_day = int(series.days[hi - 1]) if hi > lo else 0
+        row = self._get_disk(key)
+        if row is not None:
+            self.hits += 1
+            instrumentation.count('result_cache.disk_hits')
+            result = pickle.loads(row[4])
+            self._put_memory(key, result, row[0], row[1], row[2], row[3])
+            return result
+
+        self.misses += 1
+        instrumentation.count('result_cache.misses')
+        result = compute()
+        if result is None:
+            return None
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._put_memory(key, result, series.name or '', first_day, last_day, expires_at)
+        self._put_disk(key, result, series.name or '', first_day, last_day, expires_at)
+        return result
+
+    def invalidate(self, series: Optional[str] = None, since_day: Optional[int] = None) -> int:
+        """
+        Drops the entries computed from `series` whose date range reaches `since_day` (epoch days)
+        or later, i.e. those affected by candles added or revised from that day on. Without
+        arguments everything is dropped.
+
+        Returns:
+        - int: The number of in-memory entries dropped.
+        """
+        def affected(name, last_day):
+            return (series is None or name == (series or '')) and (since_day is None or last_day >= since_day)
+
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if affected(entry[2], entry[4])]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            if self._conn is not None:
+                query, params = "DELETE FROM results WHERE 1 = 1", []
+                if series is not None:
+                    query += " AND series = ?"
+                    params.append(series)
+                if since_day is not None:
+                    query += " AND last_day >= ?"
+                    params.append(since_day)
+                self._conn.execute(query, params)
+                self._conn.commit()
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Returns the process-wide result cache, creating it on first use.
+    """
+    global _result_cache
+    with _cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(path=RESULT_CACHE_PATH)
+        return _result_cache
@@ -0,0 +1,150 @@
+import hashlib
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+DATE_FORMAT = '%d-%m-%Y'
+
+
+def to_epoch_day(date) -> int:
+    """
+    Converts anything `pd.Timestamp` accepts (or a 'dd-mm-yyyy' string) to days since 1970-01-01.
+    """
+    if isinstance(date, str):
+        try:
+            date = pd.to_datetime(date, format=DATE_FORMAT)
+        except ValueError:
+            date = pd.Timestamp(date)
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+class PriceSeries:
+    """
+    Compact close-price series: int64 epoch-day dates and float prices in two contiguous arrays.
+
+    Slicing by date uses binary search and returns views, so no data is copied. Dates are only
+    turned into strings by `to_frame(date_format=...)` for export or display.
+    """
+
+    __slots__ = ('days', 'close', 'name', '_digests')
+
+    def __init__(self, days: np.ndarray, close: np.ndarray, name: Optional[str] = None, dtype=np.float64):
+        self.days = np.ascontiguousarray(days, dtype=np.int64)
+        self.close = np.ascontiguousarray(close, dtype=dtype)
+        self.name = name
+        self._digests = None
+        if self.days.shape != self.close.shape:
+            raise ValueError("Dates and prices must have the same length.")
+
+    @classmethod
+    @instrumentation.timed('price_series.from_dates')
+    def from_dates(cls, dates, close, name: Optional[str] = None, dtype=np.float64) -> 'PriceSeries':
+        """
+        Builds a series from datetime-like dates, dropping missing prices.
+        """
+        days = np.asarray(pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64))
+        close = np.asarray(pd.to_numeric(pd.Series(close), errors='coerce'), dtype=np.float64)
+        present = ~np.isnan(close)
+        return cls(days[present], close[present], name, dtype)
+
+    @classmethod
+    def from_frame(cls, df: Union[pd.DataFrame, pd.Series], column: Optional[str] = None, dtype=np.float64) -> 'PriceSeries':
+        """
+        Builds a series from a price frame indexed by date (a DatetimeIndex or 'dd-mm-yyyy' strings).
+        """
+        if isinstance(df, pd.DataFrame):
+            column = df.columns[0] if column is None else column
+            values = df[column]
+        else:
+            values = df
+            column = df.name
+        index = df.index
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.to_datetime(index, format=DATE_FORMAT)
+        return cls.from_dates(index, values.to_numpy(), column, dtype)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return f"PriceSeries(name={self.name!r}, empty)"
+        return (f"PriceSeries(name={self.name!r}, {len(self)} prices, "
+                f"{self.first_date:%d-%m-%Y} to {self.last_date:%d-%m-%Y}, {self.close.dtype})")
+
+    @property
+    def dates(self) -> np.ndarray:
+        """
+        The dates as a zero-copy datetime64[D] view.
+        """
+        return self.days.view('datetime64[D]')
+
+    @property
+    def first_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self.dates[0]) if len(self) else None
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self.dates[-1]) if len(self) else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.close.nbytes
+
+    def bounds(self, start=None, end=None):
+        """
+        Returns the [lo, hi) positions of the dates between `start` and `end` (both inclusive).
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.days, to_epoch_day(start), side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.days, to_epoch_day(end), side='right'))
+        return lo, max(lo, hi)
+
+    def slice(self, start=None, end=None) -> 'PriceSeries':
+        """
+        Returns the prices between two dates (inclusive) as views into this series.
+        """
+        lo, hi = self.bounds(start, end)
+        return PriceSeries(self.days[lo:hi], self.close[lo:hi], self.name, self.close.dtype)
+
+    def digest(self, lo: int = 0, hi: Optional[int] = None) -> str:
+        """
+        Returns a content hash of the prices at positions [lo, hi), cached per range.
+
+        The arrays are treated as immutable; the hash covers dates, prices and the price dtype.
+        """
+        hi = len(self) if hi is None else hi
+        if self._digests is None:
+            self._digests = {}
+        digest = self._digests.get((lo, hi))
+        if digest is None:
+            h = hashlib.blake2b(self.close.dtype.str.encode(), digest_size=16)
+            h.update(self.days[lo:hi])
+            h.update(self.close[lo:hi])
+            digest = self._digests[(lo, hi)] = h.hexdigest()
+        return digest
+
+    def astype(self, dtype) -> 'PriceSeries':
+        return PriceSeries(self.days, self.close, self.name, dtype)
+
+    def to_frame(self, date_format: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns the series as a one-column DataFrame indexed by 'Date'.
+
+        The index is a DatetimeIndex unless `date_format` is given, e.g. '%d-%m-%Y' for export.
+        """
+        index = pd.DatetimeIndex(self.dates.astype('datetime64[ns]'), name='Date')
+        if date_format is not None:
+            index = pd.Index(index.strftime(date_format), name='Date')
+        return pd.DataFrame({self.name or 'Close': self.close}, index=index)
+
+
+def as_price_series(data, column: Optional[str] = None) -> PriceSeries:
+    """
+    Returns `data` as a PriceSeries, converting price frames without modifying them.
+    """
+    if isinstance(data, PriceSeries):
+        return data
+    return PriceSeries.from_frame(data, column)
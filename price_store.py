@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+from itertools import repeat
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from config import PRICE_STORE_PATH
+
+
+class PriceStore:
+    """
+    On-disk SQLite store for candle data, keyed by instrument and granularity.
+
+    Alongside the candles the store keeps, for every (instrument, granularity) pair,
+    the earliest date that has been requested from the API (`covered_from`) and the
+    time of the last refresh (`checked_at`). Together these tell the tracker whether a
+    query can be answered from disk or needs a (delta) fetch.
+    """
+
+    def __init__(self, path: str = PRICE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS candles (
+                instrument TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                PRIMARY KEY (instrument, granularity, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                instrument TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                covered_from INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (instrument, granularity)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def coverage(self, instrument: str, granularity: str) -> Optional[Tuple[int, float]]:
+        """
+        Returns (covered_from, checked_at) for the series, or None if it was never fetched.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT covered_from, checked_at FROM coverage WHERE instrument = ? AND granularity = ?",
+                (instrument, granularity),
+            ).fetchone()
+        return row
+
+    def last_timestamp(self, instrument: str, granularity: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(ts) FROM candles WHERE instrument = ? AND granularity = ?",
+                (instrument, granularity),
+            ).fetchone()
+        return row[0]
+
+    @instrumentation.timed('price_store.upsert')
+    def upsert(self, instrument: str, granularity: str, candles: pd.DataFrame, covered_from: Optional[int]) -> int:
+        """
+        Merges downloaded candles into the store and widens the recorded coverage.
+
+        Args:
+        - instrument (str): The fxempire instrument, e.g. 'XAU/USD'.
+        - granularity (str): The candle granularity, e.g. 'D'.
+        - candles (pd.DataFrame): Candles with a 'Date' column and the OHLC columns returned by the API.
+        - covered_from (int): Unix timestamp the fetch started from. None leaves the coverage as
+          it is, for the pages of a streamed fetch that is recorded with `mark_covered` once complete.
+
+        Returns:
+        - int: The number of candles written.
+        """
+        dates = pd.to_datetime(candles["Date"], utc=True).dt.tz_localize(None)
+        ts = (dates - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        prices = candles.reindex(columns=["Open", "High", "Low", "Close"]).apply(pd.to_numeric, errors="coerce")
+        prices = prices.to_numpy(dtype=np.float64)
+        columns = [np.where(np.isnan(prices[:, j]), None, prices[:, j]).tolist() for j in range(4)]
+        rows = list(zip(repeat(instrument), repeat(granularity), ts.astype(np.int64).tolist(), *columns))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles (instrument, granularity, ts, open, high, low, close) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if covered_from is not None:
+                self._mark_covered(instrument, granularity, covered_from)
+            self._conn.commit()
+        return len(rows)
+
+    def _mark_covered(self, instrument: str, granularity: str, covered_from: int, refreshed: bool = True):
+        self._conn.execute(
+            """
+            INSERT INTO coverage (instrument, granularity, covered_from, checked_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (instrument, granularity) DO UPDATE SET
+                covered_from = MIN(covered_from, excluded.covered_from),
+                checked_at = CASE WHEN ? THEN excluded.checked_at ELSE checked_at END
+            """,
+            (instrument, granularity, int(covered_from), time.time() if refreshed else 0.0, refreshed),
+        )
+
+    def mark_covered(self, instrument: str, granularity: str, covered_from: int, refreshed: bool = True):
+        """
+        Widens the recorded coverage to `covered_from` and, if `refreshed`, marks the series as just
+        refreshed. Pass refreshed=False after a fetch that stopped before the present, so the next
+        query for recent candles still fetches them.
+        """
+        with self._lock:
+            self._mark_covered(instrument, granularity, covered_from, refreshed)
+            self._conn.commit()
+
+    @instrumentation.timed('price_store.load')
+    def load(self, instrument: str, granularity: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Reads stored candles between two unix timestamps (inclusive) as a DataFrame
+        with a 'Date' column and the OHLC prices, ordered by date.
+        """
+        query = "SELECT ts, open, high, low, close FROM candles WHERE instrument = ? AND granularity = ?"
+        params = [instrument, granularity]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND ts <= ?"
+            params.append(int(end))
+        query += " ORDER BY ts"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        df = pd.DataFrame(rows, columns=["ts", "Open", "High", "Low", "Close"])
+        df.insert(0, "Date", pd.to_datetime(df.pop("ts"), unit="s"))
+        instrumentation.count('rows.candles_loaded', len(df))
+        return df
+
+    def iter_load(self, instrument: str, granularity: str, start: Optional[int] = None, end: Optional[int] = None,
+                  chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Yields the stored candles between two unix timestamps (inclusive) in chunks of at most
+        `chunk_rows`, in the layout of `load`, so histories larger than memory can be processed.
+        """
+        query = ("SELECT ts, open, high, low, close FROM candles WHERE instrument = ? AND granularity = ? "
+                 "AND ts >= ? AND ts <= ? ORDER BY ts LIMIT ?")
+        after = -2 ** 63 if start is None else int(start)
+        end = 2 ** 63 - 1 if end is None else int(end)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (instrument, granularity, after, end, chunk_rows)).fetchall()
+            if not rows:
+                return
+            df = pd.DataFrame(rows, columns=["ts", "Open", "High", "Low", "Close"])
+            df.insert(0, "Date", pd.to_datetime(df.pop("ts"), unit="s"))
+            instrumentation.count('rows.candles_loaded', len(df))
+            yield df
+            if len(rows) < chunk_rows:
+                return
+            after = rows[-1][0] + 1
@@ -0,0 +1,298 @@
+"""
+Matplotlib/seaborn rendering of the results produced by `analysis` and `data_fetcher`.
+
+This module is only imported when a figure is requested, so computing results does not pay
+for loading the plotting stack.
+"""
+from typing import Optional
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.ticker import FuncFormatter
+
+import instrumentation
+from analysis import ROLLING_WINDOW
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _finish(fig, show: bool):
+    if show:
+        plt.show()
+        # Closing releases the figure from pyplot; it would otherwise stay alive for the whole session.
+        plt.close(fig)
+    return fig
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: Optional[int]):
+    """
+    Reduces a line to about `max_points` points for plotting.
+
+    The series is cut into `max_points / 2` equal buckets and only the minimum and maximum of
+    each (plus both end points) are kept, so peaks and troughs survive.
+
+    Args:
+    - x (np.ndarray): The x values, e.g. dates.
+    - y (np.ndarray): The y values; NaNs are allowed.
+    - max_points (int): Target number of points, None to keep everything.
+
+    Returns:
+    - tuple: The kept x and y values.
+    """
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return x, y
+
+    buckets = max(1, max_points // 2)
+    size = -(-n // buckets)
+    blocks = np.full(buckets * size, np.nan)
+    blocks[:n] = y
+    blocks = blocks.reshape(buckets, size)
+    missing = np.isnan(blocks)
+
+    offsets = np.arange(buckets) * size
+    lows = np.argmin(np.where(missing, np.inf, blocks), axis=1) + offsets
+    highs = np.argmax(np.where(missing, -np.inf, blocks), axis=1) + offsets
+    keep = np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+    keep = keep[keep < n]
+    return x[keep], y[keep]
+
+
+def _line(ax, index, values, max_points: Optional[int] = None, **kwargs):
+    x, y = downsample(np.asarray(index), np.asarray(values, dtype=np.float64), max_points)
+    ax.plot(x, y, **kwargs)
+
+
+def _draw_heatmap(ax, heatmap_data: pd.DataFrame, cbar_ax=None, max_annotations: Optional[int] = None):
+    """
+    Draws the Year x Month heatmap.
+
+    Without `max_annotations` seaborn draws it with every cell annotated. With it a plain
+    `pcolormesh` is used and cells are only annotated when there are at most `max_annotations`;
+    seaborn lays out the whole figure once more to place its labels, which dominates the cost of
+    a report.
+    """
+    if max_annotations is None:
+        sns.heatmap(heatmap_data, cmap='coolwarm', annot=True, fmt=".2f", ax=ax, cbar_ax=cbar_ax)
+        return
+
+    values = heatmap_data.to_numpy(dtype=np.float64)
+    present = ~np.isnan(values)
+    limits = (np.min(values[present]), np.max(values[present])) if present.any() else (None, None)
+    mesh = ax.pcolormesh(np.ma.masked_invalid(values), cmap='coolwarm', vmin=limits[0], vmax=limits[1])
+    ax.set_xlim(0, values.shape[1])
+    ax.set_ylim(values.shape[0], 0)
+    # Like seaborn, label only every n-th year once they would overlap.
+    step = max(1, -(-values.shape[0] // 20))
+    ax.set_yticks(np.arange(0, values.shape[0], step) + 0.5, labels=heatmap_data.index[::step])
+    if present.sum() <= max_annotations:
+        for row, column in zip(*np.nonzero(present)):
+            ax.text(column + 0.5, row + 0.5, f"{values[row, column]:.2f}", ha='center', va='center', fontsize=7)
+    ax.figure.colorbar(mesh, cax=cbar_ax, ax=None if cbar_ax is not None else ax)
+
+
+def _draw_rolling_and_heatmap(ax_rolling, ax_heatmap, df: pd.DataFrame, heatmap_data: pd.DataFrame, rolling_title: str,
+                              heatmap_title: str, max_points: Optional[int] = None, cbar_ax=None,
+                              max_annotations: Optional[int] = None):
+    _line(ax_rolling, df.index, df['Rolling_Mean'], max_points, label='Rolling Mean', color='orange')
+    _line(ax_rolling, df.index, df['Rolling_STD'], max_points, label='Rolling Standard Deviation', color='purple')
+    ax_rolling.set_title(rolling_title)
+    ax_rolling.set_xlabel('Date')
+    ax_rolling.set_ylabel('Value')
+    ax_rolling.legend()
+
+    with instrumentation.span('render.heatmap'):
+        _draw_heatmap(ax_heatmap, heatmap_data, cbar_ax, max_annotations)
+    ax_heatmap.set_title(heatmap_title)
+    ax_heatmap.set_xlabel('Month')
+    ax_heatmap.set_ylabel('Year')
+    ax_heatmap.set_xticks(np.arange(len(heatmap_data.columns)) + 0.5,
+                          labels=[MONTH_LABELS[int(month) - 1] for month in heatmap_data.columns])
+
+
+def draw_investment_analysis(fig, axes, result: dict, max_points: Optional[int] = None, cbar_ax=None,
+                             max_annotations: Optional[int] = None):
+    """
+    Draws the single investment analysis onto `fig` and its 2x2 `axes`.
+
+    `max_points` downsamples the daily lines, `cbar_ax` is an existing axes for the heatmap's
+    colorbar (otherwise it takes space from the heatmap axes) and `max_annotations` selects the
+    lightweight heatmap, see `_draw_heatmap`.
+    """
+    metrics = result['metrics']
+    df_filtered = result['series']
+    (ax_price, ax_value), (ax_rolling, ax_heatmap) = axes
+
+    metrics_text = (f"Initial Investment: ${metrics['initial_investment']:.2f}\n"
+                    f"Final Value: ${metrics['final_value']:.2f}\n"
+                    f"Total Return: ${metrics['total_return']:.2f}\n"
+                    f"Annualized Return: {metrics['annualized_return']:.2%}")
+    fig.suptitle(f"Investment Analysis from {metrics['start_date'].strftime('%d-%m-%Y')} to {metrics['end_date'].strftime('%d-%m-%Y')}\n{metrics_text}", fontsize=12, fontweight='bold')
+
+    _line(ax_price, df_filtered.index, df_filtered.iloc[:, 0], max_points, label='Price')
+    ax_price.set_title('Price Over Time')
+    ax_price.set_xlabel('Date')
+    ax_price.set_ylabel('Price (USD)')
+    ax_price.legend()
+
+    _line(ax_value, df_filtered.index, df_filtered['Investment_Value'], max_points, label='Investment Value', color='green')
+    ax_value.set_title('Investment Value Over Time')
+    ax_value.set_xlabel('Date')
+    ax_value.set_ylabel('Value (USD)')
+    ax_value.legend()
+
+    _draw_rolling_and_heatmap(ax_rolling, ax_heatmap, df_filtered, result['monthly_returns'],
+                              f'Rolling Mean and Std Dev ({ROLLING_WINDOW}-Days)',
+                              'Heatmap of Monthly Mean Daily Returns', max_points, cbar_ax, max_annotations)
+
+
+def draw_periodic_investment(fig, axes, result: dict, commodity_type: str, max_points: Optional[int] = None, cbar_ax=None,
+                             max_annotations: Optional[int] = None):
+    """
+    Draws the periodic investment analysis onto `fig` and its 2x2 `axes`, see `draw_investment_analysis`.
+    """
+    metrics = result['metrics']
+    df = result['series']
+    growth_df = result['growth']
+    (ax_price, ax_growth), (ax_rolling, ax_heatmap) = axes
+
+    metrics_text = (f"Periodical Investment Analysis:\n"
+                    f"Total invested: ${metrics['total_invested']:.2f}\n"
+                    f"Final Value: ${metrics['final_value']:.2f}\n"
+                    f"Total Return: ${metrics['total_return']:.2f}\n"
+                    f"Annualized Return: {metrics['annualized_return']:.2%}")
+
+    fig.suptitle(f"{commodity_type.capitalize()} Investment Analysis\n{metrics_text}", fontsize=12, fontweight='bold')
+
+    _line(ax_price, df.index, df.iloc[:, 0], max_points, label='Price')
+    ax_price.set_title(f'{commodity_type.capitalize()} Price in Time')
+    ax_price.set_xlabel('Date')
+    ax_price.set_ylabel('Price (USD)')
+    ax_price.legend()
+
+    _line(ax_growth, growth_df.index, growth_df['Value'], max_points, label='Investment Value', color='green')
+    _line(ax_growth, growth_df.index, growth_df['Total_Invested'], max_points, label='Total Invested', color='red', linestyle='--')
+    ax_growth.set_title('Periodical Investment Growth In time')
+    ax_growth.set_xlabel('Date')
+    ax_growth.set_ylabel('Value (USD)')
+    ax_growth.legend()
+
+    _draw_rolling_and_heatmap(ax_rolling, ax_heatmap, df, result['monthly_returns'],
+                              f'Rolling Mean and Rolling Std. ({ROLLING_WINDOW}-Days)',
+                              'Heatmap of Monthly mean of the daily returns', max_points, cbar_ax, max_annotations)
+
+
+def draw_commodity_comparison(fig, ax, result: dict, max_points: Optional[int] = None):
+    normalized = result['series']
+
+    for column in normalized.columns:
+        _line(ax, normalized.index, normalized[column], max_points, label=column)
+    ax.set_title(f"{' vs '.join(normalized.columns)} Price Comparison (Normalized)")
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Normalized Price (Base = 100)')
+    ax.legend()
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    fig.autofmt_xdate()
+
+
+def draw_indicator_comparison(fig, ax, merged_data: pd.DataFrame, economic_series_id: str, max_points: Optional[int] = None):
+    def quarter_format(x, pos=None):
+        date = mdates.num2date(x)
+        return f"{date.year}-Q{(date.month-1)//3 + 1}"
+
+    _line(ax, merged_data.index, merged_data['commodity_index'], max_points, label='Commodity Price Index', color='blue')
+    _line(ax, merged_data.index, merged_data['economic_index'], max_points, label=f'{economic_series_id} Indicator Index', color='orange')
+
+    ax.xaxis.set_major_locator(mdates.MonthLocator(bymonth=[1, 4, 7, 10]))
+    ax.xaxis.set_major_formatter(FuncFormatter(quarter_format))
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+    fig.autofmt_xdate()
+
+    ax.xaxis.set_minor_locator(mdates.MonthLocator())
+    ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
+
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Index Value')
+    ax.set_title(f'Commodity Price Index vs {economic_series_id} Indicator Index (Base = 100)')
+    ax.legend()
+    ax.grid(which='major')
+
+
+@instrumentation.timed('render.investment_analysis')
+def plot_investment_analysis(result: dict, show: bool = True):
+    fig = plt.figure(figsize=(15, 10))
+    draw_investment_analysis(fig, fig.subplots(2, 2), result)
+    plt.tight_layout(rect=[0, 0, 1, 0.96])
+    return _finish(fig, show)
+
+
+@instrumentation.timed('render.periodic_investment')
+def plot_periodic_investment(result: dict, commodity_type: str, show: bool = True):
+    fig = plt.figure(figsize=(15, 10))
+    draw_periodic_investment(fig, fig.subplots(2, 2), result, commodity_type)
+    plt.tight_layout(rect=[0, 0, 1, 0.96])
+    return _finish(fig, show)
+
+
+@instrumentation.timed('render.commodity_comparison')
+def plot_commodity_comparison(result: dict, show: bool = True):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    draw_commodity_comparison(fig, ax, result)
+    plt.tight_layout()
+    return _finish(fig, show)
+
+
+@instrumentation.timed('render.indicator_comparison')
+def plot_indicator_comparison(merged_data: pd.DataFrame, economic_series_id: str, show: bool = True):
+    fig, ax = plt.subplots(figsize=(15, 8))
+    draw_indicator_comparison(fig, ax, merged_data, economic_series_id)
+    plt.tight_layout()
+    return _finish(fig, show)
+
+
+@instrumentation.timed('render.relationships')
+def plot_relationships(top_increasing: pd.Series, top_decreasing: pd.Series, show: bool = True):
+    sns.set_style("whitegrid")
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 10))
+
+    def add_value_labels(ax, spacing=0.01):
+        for rect in ax.patches:
+            value = rect.get_width()
+            text = f'{value:.2f}'
+            y = rect.get_y() + rect.get_height() / 2
+            x = rect.get_width()
+            ha = 'left' if value >= 0 else 'right'
+            ax.text(x + np.sign(x) * spacing, y, text, ha=ha, va='center')
+
+    sns.barplot(x=top_increasing.values, y=top_increasing.index, ax=ax1, palette='YlOrRd')
+    ax1.set_title('Top 10 Increasing Relationships', fontsize=16, fontweight='bold')
+    ax1.set_xlabel('Spearman Correlation Coefficient', fontsize=12)
+    ax1.set_ylabel('')
+    ax1.axvline(0, color='grey', lw=1, linestyle='--')
+    add_value_labels(ax1)
+
+    sns.barplot(x=top_decreasing.values, y=top_decreasing.index, ax=ax2, palette='YlGnBu_r')
+    ax2.set_title('Top 10 Decreasing Relationships', fontsize=16, fontweight='bold')
+    ax2.set_xlabel('Spearman Correlation Coefficient', fontsize=12)
+    ax2.set_ylabel('')
+    ax2.axvline(0, color='grey', lw=1, linestyle='--')
+    add_value_labels(ax2)
+
+    plt.tight_layout()
+    fig.suptitle('Top Increasing and Decreasing Relationships', fontsize=20, fontweight='bold', y=1.05)
+
+    sm1 = plt.cm.ScalarMappable(cmap='YlOrRd', norm=plt.Normalize(vmin=0, vmax=1))
+    sm2 = plt.cm.ScalarMappable(cmap='YlGnBu_r', norm=plt.Normalize(vmin=-1, vmax=0))
+    cbar1 = fig.colorbar(sm1, ax=ax1, orientation='horizontal', pad=0.08, aspect=30)
+    cbar2 = fig.colorbar(sm2, ax=ax2, orientation='horizontal', pad=0.08, aspect=30)
+    cbar1.set_label('Strength of Positive Correlation', fontsize=10)
+    cbar2.set_label('Strength of Negative Correlation', fontsize=10)
+
+    return _finish(fig, show)
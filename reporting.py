@@ -0,0 +1,165 @@
+"""
+Batch rendering of analysis reports straight to image files.
+
+Figures are drawn with the non-interactive Agg canvas and never touch pyplot, so reports can
+be produced on a headless server and nothing accumulates between them. Every report kind keeps
+one figure with its axes that is cleared and redrawn for each report, long daily series are
+downsampled before plotting, and `render_reports` spreads many reports over a process pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import instrumentation
+import rendering
+
+REPORT_KINDS = ('investment', 'periodic', 'comparison', 'indicator')
+REPORT_FORMATS = ('png', 'svg', 'pdf')
+
+# Points kept per plotted line; a 50-year daily series has about 13,000.
+MAX_POINTS = 2000
+
+# Heatmaps with more cells than this (about 20 years of months) are drawn without annotations.
+MAX_ANNOTATIONS = 240
+
+# Reports handed to a worker at a time by `render_reports`.
+REPORTS_PER_TASK = 8
+
+_FIGURE_SIZES = {'investment': (15, 10), 'periodic': (15, 10), 'comparison': (12, 6), 'indicator': (15, 8)}
+
+_renderer = None
+
+
+class ReportRenderer:
+    """
+    Renders reports to files, reusing one figure and its axes per report kind.
+
+    Args:
+    - dpi (int): Resolution of raster output.
+    - max_points (int): Points kept per plotted line, None to plot every point.
+    - max_annotations (int): Largest heatmap that still gets a value in every cell.
+    """
+
+    def __init__(self, dpi: int = 100, max_points: Optional[int] = MAX_POINTS, max_annotations: int = MAX_ANNOTATIONS):
+        self.dpi = dpi
+        self.max_points = max_points
+        self.max_annotations = max_annotations
+        self._figures: Dict[str, tuple] = {}
+
+    def _figure(self, kind: str):
+        """
+        Returns the (figure, axes, colorbar axes) of a report kind, creating them on first use and clearing them after.
+        """
+        if kind not in self._figures:
+            fig = Figure(figsize=_FIGURE_SIZES[kind])
+            FigureCanvasAgg(fig)
+            cbar_ax = None
+            if kind in ('investment', 'periodic'):
+                axes = fig.subplots(2, 2)
+                fig.subplots_adjust(left=0.06, right=0.93, bottom=0.06, top=0.82, hspace=0.35, wspace=0.2)
+                # A fixed colorbar axes, so the heatmap axes is not shrunk again on every report.
+                cbar_ax = fig.add_axes([0.945, 0.06, 0.01, 0.33])
+            else:
+                axes = fig.subplots()
+                fig.subplots_adjust(left=0.07, right=0.97, bottom=0.15, top=0.93)
+            self._figures[kind] = (fig, axes, cbar_ax)
+        else:
+            fig, axes, cbar_ax = self._figures[kind]
+            for ax in fig.axes:
+                ax.clear()
+            fig.suptitle('')
+        return self._figures[kind]
+
+    def render(self, kind: str, result: Any, path: str, **options) -> str:
+        """
+        Renders one report and writes it to `path`; the format follows the file extension.
+
+        Args:
+        - kind (str): One of `REPORT_KINDS`.
+        - result: The matching analysis output: the dict of `investment_analysis`,
+          `periodic_investment_analysis` or `instrument_comparison`, or the merged frame of
+          `indicator_comparison`.
+        - path (str): Output file ending in .png, .svg or .pdf.
+        - options: `commodity_type` for 'periodic', `economic_series_id` for 'indicator'.
+
+        Returns:
+        - str: The path written.
+        """
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unsupported report kind: {kind}. Use one of {', '.join(REPORT_KINDS)}.")
+        fmt = os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}. Use one of {', '.join(REPORT_FORMATS)}.")
+
+        with instrumentation.span(f'report.{kind}'):
+            fig, axes, cbar_ax = self._figure(kind)
+            if kind == 'investment':
+                rendering.draw_investment_analysis(fig, axes, result, self.max_points, cbar_ax, self.max_annotations)
+            elif kind == 'periodic':
+                rendering.draw_periodic_investment(fig, axes, result, options.get('commodity_type', 'commodity'),
+                                                   self.max_points, cbar_ax, self.max_annotations)
+            elif kind == 'comparison':
+                rendering.draw_commodity_comparison(fig, axes, result, self.max_points)
+            else:
+                rendering.draw_indicator_comparison(fig, axes, result, options.get('economic_series_id', 'Indicator'),
+                                                    self.max_points)
+
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with instrumentation.span('report.save'):
+                fig.savefig(path, format=fmt, dpi=self.dpi)
+        return path
+
+    def close(self):
+        self._figures.clear()
+
+
+def _init_worker(dpi: int, max_points: Optional[int], max_annotations: int):
+    global _renderer
+    _renderer = ReportRenderer(dpi, max_points, max_annotations)
+
+
+def _render_task(jobs: List[Dict[str, Any]]) -> List[str]:
+    return [_renderer.render(**job) for job in jobs]
+
+
+def render_report(kind: str, result: Any, path: str, **options) -> str:
+    """
+    Renders one report with this process's shared `ReportRenderer`, see `ReportRenderer.render`.
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = ReportRenderer()
+    return _renderer.render(kind, result, path, **options)
+
+
+def render_reports(jobs: Iterable[Dict[str, Any]], processes: Optional[int] = None, dpi: int = 100,
+                   max_points: Optional[int] = MAX_POINTS, max_annotations: int = MAX_ANNOTATIONS) -> List[str]:
+    """
+    Renders many reports, spread over a process pool.
+
+    Args:
+    - jobs (iterable): One dict per report with the arguments of `ReportRenderer.render`:
+      'kind', 'result', 'path' and any options.
+    - processes (int): Worker processes; defaults to the CPU count, 1 renders in this process.
+    - dpi (int): Resolution of raster output.
+    - max_points (int): Points kept per plotted line.
+    - max_annotations (int): Largest heatmap that still gets a value in every cell.
+
+    Returns:
+    - list: The paths written, in job order.
+    """
+    jobs = list(jobs)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) <= 1:
+        renderer = ReportRenderer(dpi, max_points, max_annotations)
+        return [renderer.render(**job) for job in jobs]
+
+    chunks = [jobs[i:i + REPORTS_PER_TASK] for i in range(0, len(jobs), REPORTS_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(processes, len(chunks)), initializer=_init_worker,
+                             initargs=(dpi, max_points, max_annotations)) as executor:
+        return [path for paths in executor.map(_render_task, chunks) for path in paths]
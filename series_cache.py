@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import FRED_CACHE_PATH
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def release_ttl(dates: pd.Series) -> float:
+    """
+    Returns how long (in seconds) a downloaded series stays fresh.
+
+    The release frequency is inferred from the median spacing of the observations: a daily
+    series is refreshed after a day, a monthly one after about half a month and a quarterly
+    one after about half a quarter.
+    """
+    if len(dates) < 2:
+        return DAY_SECONDS
+    spacing_days = np.median(np.diff(pd.to_datetime(dates).values).astype('timedelta64[D]').astype(np.int64))
+    return max(1.0, spacing_days / 2) * DAY_SECONDS
+
+
+def iso_date(date) -> str:
+    """
+    Returns anything `pd.Timestamp` accepts as a 'YYYY-MM-DD' string, which compares in date order.
+    """
+    return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+class SeriesCache:
+    """
+    On-disk SQLite cache of FRED observations keyed by series ID.
+
+    Every series remembers the date range that was requested for it and when it was
+    downloaded; an entry is served only while it covers the requested range and is younger
+    than its release-frequency based TTL (see `release_ttl`). A download that reached the day
+    it was made holds everything published so far, so it covers any later end date too.
+    """
+
+    def __init__(self, path: str = FRED_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS series (
+                series_id TEXT PRIMARY KEY,
+                observation_start TEXT NOT NULL,
+                observation_end TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                ttl REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS observations (
+                series_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (series_id, date)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def coverage(self, series_id: str) -> Optional[tuple]:
+        """
+        Returns (observation_start, observation_end, fetched_at, ttl) for a cached series, or None.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT observation_start, observation_end, fetched_at, ttl FROM series WHERE series_id = ?",
+                (series_id,),
+            ).fetchone()
+
+    def get(self, series_id: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached observations between two dates, or None if the cache does not cover
+        the range or the entry has expired.
+        """
+        coverage = self.coverage(series_id)
+        if coverage is None:
+            return None
+        observation_start, observation_end, fetched_at, ttl = coverage
+        start_date, end_date = iso_date(start_date), iso_date(end_date)
+        reached_present = observation_end >= iso_date(pd.Timestamp(fetched_at, unit='s'))
+        if (observation_start > start_date or (observation_end < end_date and not reached_present)
+                or time.time() - fetched_at >= ttl):
+            return None
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, value FROM observations WHERE series_id = ? AND date >= ? AND date <= ? ORDER BY date",
+                (series_id, start_date, end_date),
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=['Date', 'value'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df
+
+    def put(self, series_id: str, data: pd.DataFrame, start_date: str, end_date: str):
+        """
+        Replaces the cached observations of a series with a freshly downloaded range.
+        """
+        dates = pd.to_datetime(data['Date'])
+        rows = [(series_id, d, None if pd.isna(v) else float(v))
+                for d, v in zip(dates.dt.strftime('%Y-%m-%d'), data['value'])]
+
+        with self._lock:
+            self._conn.execute("DELETE FROM observations WHERE series_id = ?", (series_id,))
+            self._conn.executemany("INSERT OR REPLACE INTO observations (series_id, date, value) VALUES (?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO series (series_id, observation_start, observation_end, fetched_at, ttl) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (series_id, iso_date(start_date), iso_date(end_date), time.time(), release_ttl(dates)),
+            )
+            self._conn.commit()
@@ -0,0 +1,399 @@
+"""
+Local HTTP/JSON analytics service around one long-lived `CommodityInvestmentTracker`.
+
+The service runs on asyncio and needs nothing beyond the standard library. All requests share
+the same warm state: recently fetched price series, the tracker's price store and the result
+cache. Concurrent identical requests are coalesced into one computation whose response every
+caller receives. Fetching and light analyses run on a thread pool and CPU-heavy work (strategy
+sweeps, indicator correlations) on a process pool, so the event loop only parses requests and
+writes responses.
+
+Endpoints (GET, dates are dd-mm-yyyy, lists are comma-separated):
+
+    /prices       commodity, start_date, [end_date]
+    /investment   commodity, start_date, [end_date], [initial_investment=100]
+    /periodic     commodity, start_date, end_date, interval_days, investment_amount, [alignment=next]
+    /comparison   instruments, start_date, [end_date]
+    /correlation  commodity, series_ids, start_date, [end_date], [pvalues=0], [publication_lag=0]
+    /sweep        commodity, start_date, [end_date], intervals, [amounts=100], [every_days=30], [alignment=next]
+    /health, /stats
+
+Errors are returned as {"error": message} with status 400 for invalid parameters, 404 for an
+unknown path and 500 otherwise.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from analysis import aligned_panel, instrument_comparison
+from config import SERVICE_HOST, SERVICE_PORT
+from exporters import to_jsonable
+from price_series import PriceSeries, to_epoch_day
+
+# Longest request line or header accepted, in bytes.
+MAX_LINE = 8192
+
+_REQUIRED = object()
+
+_STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def _encode(value) -> bytes:
+    return json.dumps(to_jsonable(value), separators=(',', ':')).encode()
+
+
+def _param(query: Dict[str, str], name: str, kind: Callable = str, default=_REQUIRED):
+    value = query.get(name)
+    if value is None or value == '':
+        if default is _REQUIRED:
+            raise ValueError(f"Missing parameter: {name}")
+        return default
+    try:
+        return kind(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid value for {name}: {value!r}") from e
+
+
+def _list(value: str) -> list:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _date(day: int) -> str:
+    return pd.Timestamp(np.datetime64(day, 'D')).strftime('%d-%m-%Y')
+
+
+def _sweep(days: np.ndarray, close: np.ndarray, start_days: np.ndarray, intervals, amounts, end_day: Optional[int],
+           alignment: str) -> bytes:
+    from strategy_sweep import sweep_periodic_investment
+
+    end_date = None if end_day is None else np.datetime64(end_day, 'D')
+    result = sweep_periodic_investment(days.view('datetime64[D]'), close, start_days.view('datetime64[D]'), intervals,
+                                       amounts, end_date=end_date, alignment=alignment, processes=1)
+    result['start_date'] = result['start_date'].dt.strftime('%Y-%m-%d')
+    return _encode({'results': result.to_dict(orient='records')})
+
+
+def _correlate(commodity: pd.DataFrame, frames: Dict[str, pd.DataFrame], pvalues: bool, publication_lag: int,
+               failures: Dict[str, str]) -> bytes:
+    from correlation import correlate_indicators
+
+    result = correlate_indicators(commodity, frames, pvalues=pvalues, publication_lags=publication_lag)
+    response = {'correlation': result['correlation'].T, 'observations': len(commodity), 'failures': failures}
+    if pvalues:
+        response['pvalues'] = result['pvalues'].T
+    return _encode(response)
+
+
+def _ready() -> bool:
+    return True
+
+
+class AnalyticsService:
+    """
+    Serves the tracker's analyses over HTTP; see the module docstring for the endpoints.
+
+    Args:
+    - tracker (CommodityInvestmentTracker): Shared by all requests; a default one if None.
+    - threads (int): Threads for fetching and light analyses; defaults to the tracker's `max_workers`.
+    - processes (int): Worker processes for sweeps and correlations; defaults to the CPU count,
+      0 runs them on the thread pool instead.
+    """
+
+    def __init__(self, tracker=None, threads: Optional[int] = None, processes: Optional[int] = None):
+        if tracker is None:
+            from CIT import CommodityInvestmentTracker
+
+            tracker = CommodityInvestmentTracker()
+        self.tracker = tracker
+        self._threads = ThreadPoolExecutor(max_workers=threads or tracker.max_workers)
+        processes = (os.cpu_count() or 1) if processes is None else processes
+        self._processes: Executor = self._threads
+        if processes:
+            # Spawned workers do not inherit the locks held by the service's threads.
+            self._processes = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        # instrument -> (fetched at, first requested epoch day, prices)
+        self._series: Dict[str, Tuple[float, int, PriceSeries]] = {}
+        self._series_locks: Dict[str, asyncio.Lock] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self._server = None
+        self._routes: Dict[str, Callable[[Dict[str, str]], Awaitable[bytes]]] = {
+            '/prices': self.prices,
+            '/investment': self.investment,
+            '/periodic': self.periodic,
+            '/comparison': self.comparison,
+            '/correlation': self.correlation,
+            '/sweep': self.sweep,
+            '/health': self.health,
+            '/stats': self.stats,
+        }
+
+    async def _run(self, executor: Executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    async def _coalesce(self, key: tuple, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Runs `compute` once for all concurrent callers with the same `key`.
+
+        The shared computation is shielded, so a caller that disconnects does not cancel it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            instrumentation.count('service.coalesced')
+        return await asyncio.shield(task)
+
+    async def series(self, commodity: str, start_date: str) -> PriceSeries:
+        """
+        Returns the prices of `commodity` from at least `start_date` on, from memory when they were
+        fetched within the tracker's `refresh_interval`. Fetches of one instrument never overlap.
+        """
+        from CIT import resolve_instrument
+
+        instrument, _, _ = resolve_instrument(commodity)
+        start_day = to_epoch_day(start_date)
+        lock = self._series_locks.setdefault(instrument, asyncio.Lock())
+        async with lock:
+            cached = self._series.get(instrument)
+            if cached is not None and start_day >= cached[1] and time.time() - cached[0] < self.tracker.refresh_interval:
+                instrumentation.count('service.series_hits')
+                return cached[2]
+            instrumentation.count('service.series_misses')
+            first_day = start_day if cached is None else min(start_day, cached[1])
+            series = await self._run(self._threads, self.tracker.get_price_series, _date(first_day), commodity)
+            self._series[instrument] = (time.time(), first_day, series)
+            return series
+
+    async def prices(self, query: Dict[str, str]) -> bytes:
+        commodity, start_date = _param(query, 'commodity'), _param(query, 'start_date')
+        end_date = _param(query, 'end_date', default=None)
+        series = (await self.series(commodity, start_date)).slice(start_date, end_date)
+
+        def encode():
+            dates = np.datetime_as_string(series.dates).tolist()
+            return _encode({'name': series.name, 'dates': dates, 'close': series.close.tolist()})
+
+        return await self._run(self._threads, encode)
+
+    async def investment(self, query: Dict[str, str]) -> bytes:
+        commodity, start_date = _param(query, 'commodity'), _param(query, 'start_date')
+        end_date = _param(query, 'end_date', default=None)
+        initial_investment = _param(query, 'initial_investment', float, 100.0)
+        series = await self.series(commodity, start_date)
+
+        def compute():
+            result = self.tracker.analyze_investment(series, start_date, initial_investment, end_date, plot=False)
+            return _encode({'metrics': result['metrics']})
+
+        return await self._run(self._threads, compute)
+
+    async def periodic(self, query: Dict[str, str]) -> bytes:
+        commodity, start_date, end_date = _param(query, 'commodity'), _param(query, 'start_date'), _param(query, 'end_date')
+        interval_days = _param(query, 'interval_days', int)
+        investment_amount = _param(query, 'investment_amount', float)
+        alignment = _param(query, 'alignment', default='next')
+        series = await self.series(commodity, start_date)
+
+        def compute():
+            result = self.tracker.analyze_and_plot_periodic_investment(series, start_date, end_date, interval_days,
+                                                                       investment_amount, commodity, alignment,
+                                                                       plot=False)
+            return _encode({'metrics': result['metrics'], 'growth': result['growth']})
+
+        return await self._run(self._threads, compute)
+
+    async def comparison(self, query: Dict[str, str]) -> bytes:
+        from CIT import resolve_instrument
+
+        instruments, start_date = _list(_param(query, 'instruments')), _param(query, 'start_date')
+        end_date = _param(query, 'end_date', default=None)
+        if len(instruments) < 2:
+            raise ValueError("Comparison needs at least two instruments.")
+        labels = [resolve_instrument(name)[2] for name in instruments]
+        series = await asyncio.gather(*(self.series(name, start_date) for name in instruments))
+
+        def compute():
+            panel = aligned_panel(dict(zip(labels, series)))
+            result = instrument_comparison(panel, start_date, end_date)
+            return _encode({'metrics': result['metrics'], 'correlation': result['correlation']})
+
+        return await self._run(self._threads, compute)
+
+    async def correlation(self, query: Dict[str, str]) -> bytes:
+        from data_fetcher import fetch_economic_data
+
+        commodities, series_ids = _list(_param(query, 'commodity')), _list(_param(query, 'series_ids'))
+        start_date, end_date = _param(query, 'start_date'), _param(query, 'end_date', default=None)
+        pvalues = _param(query, 'pvalues', _flag, False)
+        publication_lag = _param(query, 'publication_lag', int, 0)
+        prices = await asyncio.gather(*(self.series(name, start_date) for name in commodities))
+        windows = [series.slice(start_date, end_date).to_frame() for series in prices]
+        commodity = pd.concat(windows, axis=1, join='inner')
+        if commodity.empty:
+            raise ValueError("No commodity prices in the specified date range.")
+
+        first, last = commodity.index[0], commodity.index[-1]
+        fetch_from = (first - pd.Timedelta(days=publication_lag)).strftime('%Y-%m-%d')
+        frames, failures = await self._run(self._threads, fetch_economic_data, series_ids, fetch_from,
+                                           last.strftime('%Y-%m-%d'))
+        return await self._run(self._processes, _correlate, commodity, frames, pvalues, publication_lag, failures)
+
+    async def sweep(self, query: Dict[str, str]) -> bytes:
+        commodity, start_date = _param(query, 'commodity'), _param(query, 'start_date')
+        end_date = _param(query, 'end_date', default=None)
+        intervals = [int(value) for value in _list(_param(query, 'intervals'))]
+        amounts = [float(value) for value in _list(_param(query, 'amounts', default='100'))]
+        every_days = _param(query, 'every_days', int, 30)
+        alignment = _param(query, 'alignment', default='next')
+        if not intervals or every_days < 1:
+            raise ValueError("intervals and a positive every_days are required.")
+
+        series = await self.series(commodity, start_date)
+        end_day = None if end_date is None else to_epoch_day(end_date)
+        last_day = int(series.days[-1]) if end_day is None else end_day
+        start_days = np.arange(to_epoch_day(start_date), last_day + 1, every_days, dtype=np.int64)
+        return await self._run(self._processes, _sweep, series.days, series.close, start_days, intervals, amounts,
+                               end_day, alignment)
+
+    async def health(self, query: Dict[str, str]) -> bytes:
+        return _encode({'status': 'ok'})
+
+    async def stats(self, query: Dict[str, str]) -> bytes:
+        stats = {'requests': self.requests, 'coalesced': self.coalesced, 'inflight': len(self._inflight),
+                 'series': sorted(self._series)}
+        if self.tracker.result_cache is not None:
+            stats['result_cache'] = self.tracker.result_cache.stats()
+        return _encode(stats)
+
+    async def handle(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes]:
+        """
+        Answers one request; returns the HTTP status and the JSON body.
+        """
+        self.requests += 1
+        route = self._routes.get(path)
+        if route is None:
+            return 404, _encode({'error': f"Unknown path: {path}"})
+        key = (path, tuple(sorted(query.items())))
+        try:
+            with instrumentation.span(f'service{path.replace("/", ".")}'):
+                if path in ('/health', '/stats'):
+                    return 200, await route(query)
+                return 200, await self._coalesce(key, lambda: route(query))
+        except (ValueError, KeyError) as e:
+            return 400, _encode({'error': str(e).strip('"\'')})
+        except Exception as e:
+            logging.exception(f"Error serving {path}")
+            return 500, _encode({'error': f"{type(e).__name__}: {e}"})
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves one connection; HTTP/1.1 keep-alive is honoured so clients can reuse it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                if len(request_line) > MAX_LINE:
+                    raise ValueError("Request line too long")
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    if len(line) > MAX_LINE or len(headers) > 100:
+                        raise ValueError("Request headers too long")
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                if method not in ('GET', 'HEAD'):
+                    status, body = 405, _encode({'error': f"Method not allowed: {method}"})
+                else:
+                    url = urlsplit(target)
+                    status, body = await self.handle(url.path.rstrip('/') or '/', dict(parse_qsl(url.query)))
+
+                head = (f"HTTP/1.1 {status} {_STATUS_TEXT[status]}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + (b'' if method == 'HEAD' else body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> 'AnalyticsService':
+        """
+        Starts listening and warms up the worker processes; returns once the service accepts requests.
+        """
+        if self._processes is not self._threads:
+            await self._run(self._processes, _ready)
+        self._server = await asyncio.start_server(self._client, host, port)
+        return self
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not self._threads:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+def run_service(host: str = SERVICE_HOST, port: int = SERVICE_PORT, tracker=None, processes: Optional[int] = None):
+    """
+    Runs the service until interrupted.
+    """
+    async def main():
+        service = await AnalyticsService(tracker, processes=processes).start(host, port)
+        host_, port_ = service.address
+        logging.info(f"Analytics service listening on http://{host_}:{port_}")
+        try:
+            await service.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
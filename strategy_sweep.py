@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from investment_engine import SCHEDULE_ALIGNMENTS
+
+# Upper bound for the number of cells in one (scenarios x trading days) block.
+BLOCK_CELLS = 1_000_000
+# Grids smaller than this many cells are evaluated in-process.
+PARALLEL_MIN_CELLS = 50_000_000
+
+_worker_dates = None
+_worker_prices = None
+
+
+def _init_worker(dates: np.ndarray, prices: np.ndarray):
+    global _worker_dates, _worker_prices
+    _worker_dates, _worker_prices = dates, prices
+
+
+def _to_days(values) -> np.ndarray:
+    return np.asarray(pd.DatetimeIndex(np.atleast_1d(values)).values).astype('datetime64[D]')
+
+
+def _prepare(dates, prices, end_date):
+    dates = np.asarray(dates).astype('datetime64[D]')
+    prices = np.asarray(prices, dtype=np.float64)
+    end = dates[-1] if end_date is None else _to_days(end_date)[0]
+    hi = np.searchsorted(dates, end, side='right')
+    return dates[:hi], prices[:hi], end
+
+
+def _max_drawdown(values: np.ndarray) -> np.ndarray:
+    """
+    Row-wise maximum drawdown of a (scenarios x days) value matrix that is zero before each scenario starts.
+    """
+    running_max = np.maximum.accumulate(values, axis=1)
+    ratio = np.divide(values, running_max, out=np.ones_like(values), where=running_max > 0)
+    return ratio.min(axis=1) - 1
+
+
+def _periodic_block(dates: np.ndarray, prices: np.ndarray, end: np.datetime64, starts: np.ndarray,
+                    interval_days: int, alignment: str) -> np.ndarray:
+    """
+    Evaluates one interval for a block of start dates with a unit investment amount.
+
+    Returns an array with one row per start: total invested, final value and max drawdown.
+    """
+    n = len(dates)
+    n_buys = (end - starts).astype(np.int64) // interval_days + 1
+    k = np.arange(max(int(n_buys.max()), 1))
+    schedule = starts[:, None] + (k * interval_days).astype('timedelta64[D]')[None, :]
+    scheduled = k[None, :] < n_buys[:, None]
+
+    first = np.searchsorted(dates, starts, side='left')[:, None]
+    if alignment == 'next':
+        idx = np.searchsorted(dates, schedule, side='left')
+        valid = scheduled & (idx < n)
+    elif alignment == 'previous':
+        idx = np.searchsorted(dates, schedule, side='right') - 1
+        valid = scheduled & (idx >= first)
+    elif alignment == 'exact':
+        idx = np.searchsorted(dates, schedule, side='left')
+        valid = scheduled & (idx < n)
+        valid[valid] = dates[idx[valid]] == schedule[valid]
+    else:
+        raise ValueError(f"Invalid alignment '{alignment}'. Please use one of {SCHEDULE_ALIGNMENTS}.")
+
+    # Columns before the block's earliest start never hold a position.
+    offset = int(first.min())
+    dates, prices = dates[offset:], prices[offset:]
+    n_cols = len(dates)
+
+    rows = np.broadcast_to(np.arange(len(starts))[:, None], idx.shape)
+    flat = rows[valid] * n_cols + (idx[valid] - offset)
+    buys = np.bincount(flat, minlength=len(starts) * n_cols).reshape(len(starts), n_cols)
+
+    values = np.cumsum(buys / prices, axis=1)
+    values *= prices
+
+    result = np.empty((len(starts), 3))
+    result[:, 0] = buys.sum(axis=1)
+    result[:, 1] = values[:, -1] if n_cols else 0.0
+    result[:, 2] = _max_drawdown(values) if n_cols else 0.0
+    return result
+
+
+def _periodic_task(args):
+    end, starts, interval_days, alignment = args
+    return _periodic_block(_worker_dates, _worker_prices, end, starts, interval_days, alignment)
+
+
+def _run_blocks(task, blocks: list, dates: np.ndarray, prices: np.ndarray, processes: Optional[int]) -> list:
+    if processes is None:
+        total_cells = len(blocks) * BLOCK_CELLS
+        processes = os.cpu_count() if total_cells >= PARALLEL_MIN_CELLS else 1
+
+    if processes <= 1 or len(blocks) == 1:
+        _init_worker(dates, prices)
+        return [task(block) for block in blocks]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(dates, prices)) as executor:
+        return list(executor.map(task, blocks))
+
+
+@instrumentation.timed('sweep.periodic_investment')
+def sweep_periodic_investment(dates, prices, start_dates: Iterable, intervals: Iterable[int],
+                              amounts: Iterable[float] = (100,), end_date=None, alignment: str = 'next',
+                              processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Evaluates the periodic investment strategy for every combination of start date, interval and amount.
+
+    Start dates are evaluated in blocks as a 2-D (scenarios x trading days) array; large grids are
+    spread across a process pool. Results scale linearly with the amount, so every (start, interval)
+    pair is simulated once with a unit amount.
+
+    Args:
+    - dates (np.ndarray): Sorted trading dates (datetime64).
+    - prices (np.ndarray): Close prices matching `dates`.
+    - start_dates (iterable): Candidate first investment dates.
+    - intervals (iterable of int): Candidate intervals in days.
+    - amounts (iterable of float): Candidate amounts invested per period.
+    - end_date: Last day of every schedule, defaults to the last available date.
+    - alignment (str): How non-trading schedule dates are filled, see `investment_engine.align_schedule`.
+    - processes (int, optional): Worker processes, None picks automatically based on the grid size.
+
+    Returns:
+    - pd.DataFrame: One row per combination with total_invested, final_value, total_return,
+      annualized_return and max_drawdown.
+    """
+    dates, prices, end = _prepare(dates, prices, end_date)
+    starts = np.unique(_to_days(start_dates))
+    starts = starts[starts <= end]
+    intervals = [int(i) for i in intervals]
+    amounts = np.asarray(list(amounts), dtype=np.float64)
+    if len(dates) == 0 or len(starts) == 0:
+        raise ValueError("No data available in the specified date range.")
+
+    block_rows = max(1, BLOCK_CELLS // len(dates))
+    blocks = [(end, starts[i:i + block_rows], interval, alignment)
+              for interval in intervals for i in range(0, len(starts), block_rows)]
+    unit = np.concatenate(_run_blocks(_periodic_task, blocks, dates, prices, processes))
+
+    n_pairs = len(unit)
+    pair_starts = np.concatenate([block[1] for block in blocks])
+    pair_intervals = np.concatenate([np.full(len(block[1]), block[2]) for block in blocks])
+
+    result = pd.DataFrame({
+        'start_date': np.repeat(pair_starts, len(amounts)),
+        'interval_days': np.repeat(pair_intervals, len(amounts)),
+        'investment_amount': np.tile(amounts, n_pairs),
+        'total_invested': np.repeat(unit[:, 0], len(amounts)) * np.tile(amounts, n_pairs),
+        'final_value': np.repeat(unit[:, 1], len(amounts)) * np.tile(amounts, n_pairs),
+        'max_drawdown': np.repeat(unit[:, 2], len(amounts)),
+    })
+    result['start_date'] = result['start_date'].astype('datetime64[ns]')
+    result['total_return'] = result['final_value'] - result['total_invested']
+
+    years = (end - result['start_date'].to_numpy().astype('datetime64[D]')).astype(np.int64) / 365.25
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annualized = (result['final_value'] / result['total_invested']) ** (1 / years) - 1
+    result['annualized_return'] = np.where(years > 0, annualized, 0.0)
+    return result[['start_date', 'interval_days', 'investment_amount', 'total_invested',
+                   'final_value', 'total_return', 'annualized_return', 'max_drawdown']]
+
+
+def _lump_sum_task(args):
+    lo, hi = args
+    window = _worker_prices[lo:]
+    active = np.arange(len(window))[None, :] >= np.arange(hi - lo)[:, None]
+    return _max_drawdown(np.where(active, window, 0.0))
+
+
+@instrumentation.timed('sweep.lump_sum')
+def lump_sum_returns(dates, prices, initial_investment: float = 100, end_date=None,
+                     processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Computes the outcome of a single investment for every possible start date.
+
+    Returns:
+    - pd.DataFrame: Indexed by start date, with final_value, total_return, annualized_return and
+      max_drawdown of an `initial_investment` held until `end_date`.
+    """
+    dates, prices, end = _prepare(dates, prices, end_date)
+    if len(dates) == 0:
+        raise ValueError("No data available in the specified date range.")
+
+    final_value = initial_investment * prices[-1] / prices
+    years = (end - dates).astype(np.int64) / 365.25
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annualized = np.where(years > 0, (final_value / initial_investment) ** (1 / years) - 1, 0.0)
+
+    block_rows = max(1, BLOCK_CELLS // len(dates))
+    blocks = [(i, min(i + block_rows, len(dates))) for i in range(0, len(dates), block_rows)]
+    drawdown = np.concatenate(_run_blocks(_lump_sum_task, blocks, dates, prices, processes))
+
+    return pd.DataFrame({
+        'final_value': final_value,
+        'total_return': final_value - initial_investment,
+        'annualized_return': annualized,
+        'max_drawdown': drawdown,
+    }, index=pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Date'))
+
+
+def lump_sum_return_surface(dates, prices, horizons_days: Sequence[int], annualized: bool = False) -> pd.DataFrame:
+    """
+    Builds a start date x holding period return surface for a single investment.
+
+    Every cell is the return from buying at the start date's close and selling at the last close on
+    or before start + horizon; cells whose horizon runs past the available data are NaN.
+    """
+    dates = np.asarray(dates).astype('datetime64[D]')
+    prices = np.asarray(prices, dtype=np.float64)
+    horizons = np.asarray(list(horizons_days), dtype=np.int64)
+
+    targets = dates[:, None] + horizons.astype('timedelta64[D]')[None, :]
+    exit_idx = np.searchsorted(dates, targets, side='right') - 1
+    surface = prices[exit_idx] / prices[:, None] - 1
+    surface[targets > dates[-1]] = np.nan
+    if annualized:
+        surface = (1 + surface) ** (365.25 / horizons[None, :]) - 1
+
+    return pd.DataFrame(surface, index=pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Date'),
+                        columns=pd.Index(horizons, name='horizon_days'))
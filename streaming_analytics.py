@@ -0,0 +1,191 @@
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis import ROLLING_WINDOW
+
+
+class IncrementalAnalytics:
+    """
+    Keeps the price statistics of one instrument up to date one candle at a time.
+
+    Every `append` updates, in O(1): the rolling mean/std over `rolling_window` closes, the daily
+    return, the running maximum and drawdown, the cumulative return and the monthly sum/count of
+    daily returns. The per-candle outputs are kept as history so any date range can be sliced
+    without recomputation, and monthly mean returns are read from the pre-aggregated buckets.
+
+    Every method holds `lock`, so the engine can be updated while other threads read it; hold it
+    yourself to keep several reads consistent with each other.
+    """
+
+    def __init__(self, rolling_window: int = ROLLING_WINDOW):
+        self.rolling_window = rolling_window
+        self.lock = threading.RLock()
+        self._window = deque()
+        self._shift = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._first_close = None
+        self._last_close = None
+        self._running_max = -math.inf
+        self._max_drawdown = 0.0
+        self._buckets: Dict[tuple, list] = {}
+        self._saved_state = None
+
+        self._days = []
+        self.history = {name: [] for name in
+                        ('Close', 'Rolling_Mean', 'Rolling_STD', 'Daily_Returns', 'Drawdown', 'Cumulative_Return')}
+
+    def __len__(self):
+        return len(self._days)
+
+    @property
+    def first_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(np.datetime64(self._days[0], 'D')) if self._days else None
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(np.datetime64(self._days[-1], 'D')) if self._days else None
+
+    def _save_state(self):
+        self._saved_state = (deque(self._window), self._shift, self._sum, self._sum_sq, self._first_close,
+                             self._last_close, self._running_max, self._max_drawdown)
+
+    def _undo_last(self):
+        """
+        Reverts the most recent append so the last candle can be replaced by a revised one.
+        """
+        (self._window, self._shift, self._sum, self._sum_sq, self._first_close,
+         self._last_close, self._running_max, self._max_drawdown) = self._saved_state
+        self._saved_state = None
+
+        day = self._days.pop()
+        last_return = self.history['Daily_Returns'][-1]
+        for values in self.history.values():
+            values.pop()
+        if not math.isnan(last_return):
+            bucket = self._buckets[_month_key(day)]
+            bucket[0] -= last_return
+            bucket[1] -= 1
+
+    def append(self, date, close: float):
+        """
+        Adds one candle. A candle for the last stored date replaces it; older candles are ignored.
+        """
+        with self.lock:
+            self._append(date, close)
+
+    def _append(self, date, close: float):
+        day = int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+        if self._days and day <= self._days[-1]:
+            if day < self._days[-1] or self._saved_state is None:
+                return
+            self._undo_last()
+
+        close = float(close)
+        self._save_state()
+
+        if self._shift is None:
+            self._shift = close
+            self._first_close = close
+        shifted = close - self._shift
+        self._window.append(shifted)
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+        if len(self._window) > self.rolling_window:
+            dropped = self._window.popleft()
+            self._sum -= dropped
+            self._sum_sq -= dropped * dropped
+
+        n = len(self._window)
+        if n == self.rolling_window:
+            rolling_mean = self._sum / n + self._shift
+            variance = (self._sum_sq - self._sum * self._sum / n) / (n - 1) if n > 1 else math.nan
+            rolling_std = math.sqrt(max(variance, 0.0))
+        else:
+            rolling_mean = rolling_std = math.nan
+
+        daily_return = (close / self._last_close - 1) * 100 if self._last_close is not None else math.nan
+        if not math.isnan(daily_return):
+            bucket = self._buckets.setdefault(_month_key(day), [0.0, 0])
+            bucket[0] += daily_return
+            bucket[1] += 1
+
+        self._running_max = max(self._running_max, close)
+        drawdown = close / self._running_max - 1
+        self._max_drawdown = min(self._max_drawdown, drawdown)
+        self._last_close = close
+
+        self._days.append(day)
+        self.history['Close'].append(close)
+        self.history['Rolling_Mean'].append(rolling_mean)
+        self.history['Rolling_STD'].append(rolling_std)
+        self.history['Daily_Returns'].append(daily_return)
+        self.history['Drawdown'].append(drawdown)
+        self.history['Cumulative_Return'].append((close / self._first_close - 1) * 100)
+
+    def extend(self, dates: Iterable, closes: Iterable[float]):
+        with self.lock:
+            for date, close in zip(dates, closes):
+                if not pd.isna(close):
+                    self._append(date, close)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the latest value of every metric.
+        """
+        with self.lock:
+            if not self._days:
+                return {}
+            latest = {name: values[-1] for name, values in self.history.items()}
+            latest.update({'Date': self.last_date, 'Running_Max': self._running_max, 'Max_Drawdown': self._max_drawdown})
+            return latest
+
+    def _bounds(self, start=None, end=None):
+        lo = 0 if start is None else bisect.bisect_left(self._days, _day(start))
+        hi = len(self._days) if end is None else bisect.bisect_right(self._days, _day(end))
+        return lo, hi
+
+    def frame(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Returns the per-candle metrics between two dates (inclusive) as a DataFrame indexed by date.
+        """
+        with self.lock:
+            lo, hi = self._bounds(start, end)
+            days = self._days[lo:hi]
+            columns = {name: values[lo:hi] for name, values in self.history.items()}
+        index = pd.DatetimeIndex(np.asarray(days, dtype='datetime64[D]'), name='Date')
+        return pd.DataFrame(columns, index=index)
+
+    def monthly_returns(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Returns the Year x Month table of mean daily returns from the monthly buckets.
+
+        The range is applied at month resolution: every month touched by [start, end] is included
+        in full.
+        """
+        first = None if start is None else _month_key(_day(start))
+        last = None if end is None else _month_key(_day(end))
+        with self.lock:
+            cells = {key: total / count for key, (total, count) in self._buckets.items()
+                     if count and (first is None or key >= first) and (last is None or key <= last)}
+        if not cells:
+            return pd.DataFrame()
+
+        table = pd.Series(cells)
+        table.index.names = ['Year', 'Month']
+        return table.unstack('Month').sort_index()
+
+
+def _day(date) -> int:
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+def _month_key(day: int) -> tuple:
+    month = np.datetime64(day, 'D').astype('datetime64[M]').astype(np.int64)
+    return int(month // 12 + 1970), int(month % 12 + 1)